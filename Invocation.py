@@ -1,178 +1,382 @@
-import os
-import subprocess
 import logging
 from pathlib import Path
-from Packages.Common import Common
-from Packages.Boost import Boost
-from Packages.Vcpkg import Vcpkg
-from Packages.OneAPI_TBB import TBB
-
-def bounded_incr(idx, bound):
-    """
-    Increment idx but not beyond bound.  Throw exception if out of bounds.
-    """
-    if idx < bound - 1:
-        return idx + 1
-    else:
-        raise Exception(f'Idx ({idx+1}) is beyond bound ({bound}).')
+import Packages.Backends as Backends
+import Packages.BuildCache as BuildCache
+import Packages.DLLs
+import Packages.Diagnostics as Diagnostics
+import Packages.Distributed as Distributed
+import Packages.EnvSnapshot as EnvSnapshot
+import Packages.HeaderUnits as HeaderUnits
+import Packages.PCH as PCH
+import Packages.PGO as PGO
+import Packages.Profiles as Profiles
+import Packages.Registry as Registry
+import Packages.RunCache as RunCache
+import Packages.TimeReport as TimeReport
+import Packages.Timing as Timing
+from Packages.FileLock import FileLock, staging_path
+from Packages.Settings import settings
 
 
 class Invocation:
     """
-    Invoke the MSVC C++ compiler.  Might be possible to write another class for clang:
-    Eg: clang++ -std=gnu++2a -O3
+    Invoke the C++ compiler and the linker of the backend: those of MSVC by default, or
+    clang-cl and lld-link, or the native clang or gcc.  See Packages.Backends.
     """
 
-    def __init__(self, argv : list[str]):
-        self._compiler = "cl.exe"
-        self._target = ""
-        self._src_path = ""
-        self._flags = list()
-        self._libs = list()
-        self._common = Common(argv)
-        self._boost = Boost(self._common.argv)
-        self._vcpkg = Vcpkg(self._boost.argv)
-        self._tbb = TBB(self._vcpkg.argv)
-        self._argv = self._tbb.argv
-
-        # Arg: output target filename prefixed with "-o"
-        idx = 0
-        idx = bounded_incr(idx, len(self._argv))
-        if self._argv[idx] != "-o":
-            raise Exception('Command line missing target filename.')
-        idx = bounded_incr(idx, len(self._argv))
-        self._target = self._argv[idx]
-        idx += 1
-
-        # Arg: compiler flags
-        while idx < len(self._argv):
-            g = self._argv[idx]
-            if g.endswith(".cpp"):
-                break
-            if g.startswith("-"):
-                g = g.replace("-", "/")
-            self._flags.append(g)
-            idx += 1
-
-        # Arg error: missing source code files
-        if idx == len(self._argv):
-            raise Exception('Command line missing source code filename.')
-
-        # Arg: source code filename
-        self._src_path = self._argv[idx]
-        idx += 1
-
-        # Arg: libs for linker
-        while idx < len(self._argv):
-            self._libs.append(self._argv[idx])
-            idx += 1
+    def __init__(self, argv : list[str], cwd : str = None):
+        # The working directory of the org file:
+        self._cwd = Path(cwd) if cwd else Path.cwd()
+        self._backend = Backends.current()
+        self._request = Registry.classify(argv)
+        packages = Registry.construct(self._request)
+        self._common = packages.pop("common")
+        # The optional packages requested in argv:
+        self._packages = list(packages.values())
 
     @property
     def compiler(self):
-        return self._compiler
+        return self._backend.compiler
+
+    @property
+    def linker(self):
+        return self._backend.linker
 
     @property
     def target(self):
-        return self._target
+        return self._request.target
 
     @property
     def src_path(self):
-        return self._src_path
+        return self._request.src_path
+
+    @property
+    def _src(self) -> Path:
+        return (self._cwd / self.src_path).resolve()
 
     @property
     def flags(self):
-        return self._flags
+        return [self._backend.translate_flag(f) for f in self._request.flags]
 
     @property
     def libs(self):
-        return self._libs
+        return list(self._request.libs)
+
+    @property
+    def tool_flags(self):
+        return self._request.tool_flags
+
+    @property
+    def fail_fast(self) -> bool:
+        """
+        Should the compiler be cut off at its first error?  A block opts in with
+        -fail-fast, or out with -no-fail-fast, whatever the fail_fast setting.
+        """
+        if '-no-fail-fast' in self.tool_flags:
+            return False
+        return '-fail-fast' in self.tool_flags or settings().get('fail_fast', False)
+
+    @property
+    def distributed(self) -> bool:
+        """
+        Is SRC sent to build agents?  Only if there are any, and the backend uses cl.exe,
+        as they do, and the compilation is not timed.
+        """
+        return 'distributed' in self._backend.features and Distributed.is_enabled() and \
+            not self.time_report
+
+    @property
+    def time_report(self) -> bool:
+        """
+        Should the compilation be timed, with -time-report, to report its costliest
+        headers, classes and functions?  Only cl.exe has the switches.
+        """
+        return TimeReport.is_enabled(self.tool_flags) and \
+            'time-report' in self._backend.features
+
+    @property
+    def profile(self) -> str:
+        """
+        The build profile of the block, chosen with -profile=<name>, or else that of the
+        profile setting.
+        """
+        for flag in self.tool_flags:
+            if flag.startswith('-profile='):
+                return flag[len('-profile='):]
+        return settings().get('profile', 'default')
 
     def run(self):
         """
-        Invoke the compiler and build the target executable.
-        """
-        logging.debug(f'self.compiler == {self.compiler}')
-        logging.debug(f'self.flags == {self.flags}')
-        logging.debug(f'self.libs == {self.libs}')
-
-        SRC = Path(self.src_path).resolve()  # The temp C++ file produced by Org mode.
-        TARGET = Path(self.target).resolve() # The target executable.
-        org_cwd = Path.cwd()                 # The working directory of the org file.
-        os.chdir(str(SRC.parent))            # Set cwd to the location of SRC.
-        CWD = Path.cwd()                     # The cwd which should now be parent of SRC.
-        OBJ = CWD / (SRC.stem + ".obj")      # Obj file to be deleted later.
-        logging.debug(f'CWD    == {str(CWD)}')
-        logging.debug(f'SRC    == {str(SRC)}')
-        logging.debug(f'TARGET == {str(TARGET)}')
-        logging.debug(f'OBJ    == {str(OBJ)}')
+        Build the target executable.  With -run-cache, the target is then replaced by a
+        launcher, so its output is replayed from the run cache when Org mode runs it.
+        Evaluations of blocks with the same target wait for each other, while those of
+        other targets run at the same time.
+        """
+        TARGET = (self._cwd / self.target).resolve()
+        with FileLock(TARGET):
+            dlls = self._build(TARGET)
+            if RunCache.is_enabled(self.tool_flags):
+                if 'run-cache' in self._backend.features:
+                    RunCache.install(TARGET, dlls)
+                else:
+                    logging.info("The %s backend has no run cache.", self._backend.name)
+
+    def _build(self, TARGET : Path) -> set[Path]:
+        """
+        Invoke the compiler and then the linker to build the target executable.  The
+        object file is kept in the object cache, so a block whose only change is to its
+        libs or linker options is just linked again.  Return the DLLs copied beside the
+        target.
+        """
+        logging.debug('self.compiler == %s', self.compiler)
+        logging.debug('self.flags == %s', self.flags)
+        logging.debug('self.libs == %s', self.libs)
+
+        SRC = self._src  # The temp C++ file produced by Org mode.
+        logging.debug('CWD    == %s', str(self._cwd))
+        logging.debug('SRC    == %s', str(SRC))
+        logging.debug('TARGET == %s', str(TARGET))
         if TARGET.exists():
             TARGET.unlink()
 
-        # Compose the command line for cl.exe:
+        # Compose the command line for the compiler:
         cl_clo = [self.compiler]
         cl_clo += self._common.compiler_options
         cl_clo += self.flags
+        profile = Profiles.load(self.profile, self._backend.name)
+        cl_clo += profile['compiler_options']
+        if self.time_report:
+            cl_clo += TimeReport.OPTIONS
+        prefix = self._backend.option_prefix  # Of /D and /I, or -D and -I.
 
-        for d in self._common.defines:
-            cl_clo.append("/D" + d)
+        packages = [p for p in self._packages if p.should_use]
 
-        if self._boost.should_use:
-            for d in self._boost.defines:
-                cl_clo.append("/D" + d)
+        # Set up the environments of the packages used, merging PATH once for them all:
+        env_snapshots = [p.env_snapshot for p in packages if p.env_snapshot]
+        if env_snapshots:
+            EnvSnapshot.setup(env_snapshots)
 
-        if self._vcpkg.should_use:
-            for d in self._vcpkg.defines:
-                cl_clo.append("/D" + d)
+        for d in self._common.defines:
+            cl_clo.append(prefix + "D" + d)
 
-        if self._tbb.should_use:
-            for d in self._tbb.defines:
-                cl_clo.append("/D" + d)
+        for package in packages:
+            for d in package.defines:
+                cl_clo.append(prefix + "D" + d)
 
-        cl_clo.append("/I" + str(org_cwd)) # Include files from the current org directory.
+        # Include files from the current org directory:
+        cl_clo.append(prefix + "I" + str(self._cwd))
         for d in self._common.include_dirs:
-            cl_clo.append("/I" + str(Path(d)))
-
-        if self._boost.should_use:
-            for d in self._boost.include_dirs:
-                cl_clo.append("/I" + str(Path(d)))
-
-        if self._vcpkg.should_use:
-            for d in self._vcpkg.include_dirs:
-                cl_clo.append("/I" + str(Path(d)))
-
-        if self._tbb.should_use:
-            for d in self._tbb.include_dirs:
-                cl_clo.append("/I" + str(Path(d)))
-
-        cl_clo.append(str(SRC))
-
-        cl_clo.append("/link")
-        cl_clo.append("/out:" + str(TARGET))
-        cl_clo += self._common.linker_options
-
+            cl_clo.append(prefix + "I" + str(Path(d)))
+
+        for package in packages:
+            for d in package.include_dirs:
+                cl_clo.append(prefix + "I" + str(Path(d)))
+
+        # Import the headers included at the top of SRC as header units, or else
+        # precompile them, or reuse either.  Not when SRC is sent to build agents, which
+        # do not have them, nor when it is timed, as the cost of its headers would not
+        # show:
+        objs = list()         # The object files to link.
+        pch_headers = list()  # The headers in the precompiled header or header units.
+        units_text = None     # The text of SRC with its #includes rewritten to imports.
+        units = None
+        timed = self.time_report
+        if HeaderUnits.is_enabled(self.tool_flags) and not timed and \
+           'header-units' in self._backend.features and not self.distributed:
+            units = HeaderUnits.prepare(SRC, cl_clo)
+        if units is not None:
+            unit_options, unit_objs, pch_headers, units_text = units
+            cl_clo += unit_options
+            objs += unit_objs
+        elif PCH.is_enabled() and 'pch' in self._backend.features and \
+             not self.distributed and not timed and \
+             not any(f.startswith(("/Yc", "/Yu")) for f in self.flags):
+            pch = PCH.prepare(SRC, cl_clo)
+            if pch is not None:
+                pch_options, pch_obj, pch_headers = pch
+                cl_clo += pch_options
+                objs.append(pch_obj)
+
+        # Compose the options of the linker:
+        link_options = list(self._common.linker_options)
+        link_options += profile['linker_options']
+
+        libs = list()
         for d in self.libs:
-            cl_clo.append(str(d))
-
-        if self._boost.should_use:
-            for d in self._boost.release_libs:
-                cl_clo.append(str(d))
-
-        if self._vcpkg.should_use:
-            for d in self._vcpkg.release_libs:
-                cl_clo.append(str(d))
-
-        if self._tbb.should_use:
-            for d in self._tbb.release_libs:
-                cl_clo.append(str(d))
+            libs.append(str(d))
+
+        for package in packages:
+            for d in package.release_libs:
+                libs.append(str(d))
+        # A profile guided target differs from that of the same inputs linked without it:
+        key_clo = self._backend.link_command(link_options, [], libs, TARGET) + \
+            profile.get('optimize_linker_options', [])
+
+        # Restore the target from the build cache if it was linked before from the same
+        # object file and linker inputs.  The object file is known by the headers SRC
+        # included when it was last compiled, so none of them may have changed since.  A
+        # timed compilation is never skipped:
+        use_cache = BuildCache.is_enabled() and not timed
+        compile_key = None
+        if use_cache:
+            source_key = BuildCache.source_key(cl_clo, SRC)
+            compile_key = BuildCache.compile_key(source_key)
+            logging.debug("compile_key == %s", compile_key)
+            if compile_key is not None:
+                link_key = BuildCache.link_key(compile_key, key_clo, objs, TARGET)
+                logging.debug("link_key == %s", link_key)
+                dlls = BuildCache.restore(link_key, TARGET)
+                if dlls is not None:
+                    return dlls
+
+        # Compile SRC, unless its object file is in the object cache:
+        obj = BuildCache.cached_obj(compile_key) if compile_key is not None else None
+        if obj is None:
+            if use_cache:
+                staged_obj = BuildCache.stage_obj(source_key)
+            else:
+                staged_obj = staging_path(SRC.with_suffix(".obj"))  # To be deleted later.
+            compiled_src = SRC
+            if units_text is not None:
+                # Beside SRC, so the headers it includes in quotes are found:
+                compiled_src = staging_path(SRC)
+                compiled_src.write_text(units_text, encoding='utf-8')
+            try:
+                with Timing.span('compile', src=SRC.name):
+                    cp = self._compile(cl_clo, compiled_src, staged_obj)
+            finally:
+                if compiled_src != SRC:
+                    compiled_src.unlink()
+            if cp.returncode != 0:
+                if use_cache:
+                    BuildCache.discard_obj(staged_obj)
+                elif staged_obj.exists():
+                    staged_obj.unlink()
+                raise Exception("Compilation failed: {}".format(cp.summary()))
+            if timed:
+                self._report_time(cp.report, TARGET)
+            if use_cache:
+                compile_key = BuildCache.record_dependencies(source_key,
+                                                             pch_headers + cp.headers)
+                link_key = BuildCache.link_key(compile_key, key_clo, objs, TARGET)
+                logging.debug("compile_key == %s", compile_key)
+                logging.debug("link_key == %s", link_key)
+                obj = BuildCache.commit_obj(compile_key, staged_obj)
+            else:
+                obj = staged_obj
+
+        # Link the object files, with profile guided optimization if the profile says so:
+        objs = [obj] + objs
+        try:
+            if Profiles.is_guided(profile):
+                self._link_guided(link_options, objs, libs, profile, TARGET, packages,
+                                  link_key if use_cache else None)
+            else:
+                self._link(link_options, objs, libs, TARGET)
+        finally:
+            if not use_cache and obj.exists():
+                obj.unlink()
+
+        copied_dlls = self._deploy_dlls(packages, TARGET)
+        if use_cache:
+            BuildCache.store(link_key, TARGET, copied_dlls)
+        return copied_dlls
+
+    def _compile(self, cl_clo : list[str], SRC : Path,
+                 obj : Path) -> Diagnostics.ToolOutput:
+        """
+        Compile SRC into obj, streaming the diagnostics of the compiler as they arrive.
+        If there are build agents, SRC is preprocessed here, which also reports the
+        headers it includes, and compiled by the least loaded agent, or here if none is
+        free.
+        """
+        if self.distributed:
+            preprocessed = obj.with_suffix('.i')
+            pp_clo = cl_clo + ["/P", "/showIncludes", "/Fi" + str(preprocessed), str(SRC)]
+            logging.debug("pp_clo == %s", pp_clo)
+            try:
+                with Timing.span('preprocess', src=SRC.name):
+                    cp = Diagnostics.run_tool(pp_clo, cwd=str(SRC.parent),
+                                              fail_fast=self.fail_fast)
+                if cp.returncode != 0:
+                    return cp
+                with Timing.span('remote compile', src=SRC.name):
+                    remote = Distributed.compile_remotely(cl_clo, preprocessed, SRC, obj)
+            finally:
+                if preprocessed.exists():
+                    preprocessed.unlink()
+            if remote is not None:
+                cp.returncode, text = remote
+                Diagnostics.report(self.compiler, text, cp)
+                cp.text += text
+                return cp
+        cl_clo = self._backend.compile_command(cl_clo[1:], SRC, obj)
+        logging.debug("cl_clo == %s", cl_clo)
+        cp = Diagnostics.run_tool(cl_clo, cwd=str(SRC.parent), fail_fast=self.fail_fast,
+                                  is_report_line=TimeReport.is_report_line
+                                  if self.time_report else None)
+        cp.headers = self._backend.included_headers(cp, obj)
+        return cp
+
+    def _report_time(self, report : list[str], TARGET : Path):
+        """
+        Show the costliest phases, headers, classes and functions of the compilation as
+        an org table, with the diagnostics, and save it beside the target.
+        """
+        table = TimeReport.org_table(TimeReport.parse(report))
+        Diagnostics.report(self.compiler, table)
+        report_path = TimeReport.save(TARGET, table)
+        logging.info("Saved the time report of %s to %s", TARGET.name, report_path)
 
-        logging.debug("cl_clo == {}".format(cl_clo))
-        # Invoking the compiler with just subprocess.run seems to work well:
-        cp = subprocess.run(cl_clo, capture_output=True, text=True)
-        if OBJ.exists():
-            OBJ.unlink()
+    def _link(self, link_options : list[str], objs : list[Path], libs : list[str],
+              TARGET : Path):
+        """
+        Invoke the linker, streaming its diagnostics as they arrive.
+        """
+        link_clo = self._backend.link_command(link_options, objs, libs, TARGET)
+        logging.debug("link_clo == %s", link_clo)
+        with Timing.span('link', target=TARGET.name):
+            cp = Diagnostics.run_tool(link_clo, cwd=str(self._src.parent),
+                                      fail_fast=self.fail_fast)
         if cp.returncode != 0:
-            logging.debug("Compiler output:\n{}\n{}".format(cp.stdout,cp.stderr))
-            raise Exception("Compilation failed: \n{}".format(cp.stdout))
-        self._boost.duplicate_required_dlls(self.target)
-        self._vcpkg.duplicate_required_dlls(self.target)
-        self._tbb.duplicate_required_dlls(self.target)
+            raise Exception("Linking failed: {}".format(cp.summary()))
+
+    def _link_guided(self, link_options : list[str], objs : list[Path], libs : list[str],
+                     profile : dict, TARGET : Path, packages : list, key : str | None):
+        """
+        Link with profile guided optimization.  A block which was not trained before is
+        linked instrumented, run once to train it, and linked again with its profile.  The
+        profile is kept under the link key, so later evaluations are just linked with it.
+        """
+        def with_profile(options, pgd):
+            return link_options + [o.format(pgd=pgd) for o in profile[options]]
+
+        pgd = PGO.cached_pgd(key)
+        if pgd is not None:
+            self._link(with_profile('optimize_linker_options', pgd), objs, libs, TARGET)
+            return
+        profile_dir = PGO.stage(key)
+        pgd = profile_dir / 'target.pgd'
+        try:
+            self._link(with_profile('instrument_linker_options', pgd), objs, libs, TARGET)
+            self._deploy_dlls(packages, TARGET)  # The training run needs them.
+            with Timing.span('train', target=TARGET.name):
+                PGO.train(TARGET, profile_dir)
+            self._link(with_profile('optimize_linker_options', pgd), objs, libs, TARGET)
+        except Exception:
+            PGO.discard(profile_dir)
+            raise
+        PGO.commit(key, profile_dir)
+
+    def _deploy_dlls(self, packages : list, TARGET : Path) -> set[Path]:
+        """
+        Resolve the DLLs of all the packages in one walk of the dependency graph, and copy
+        them beside the target.  Return the copied DLLs.
+        """
+        copied_dlls = set()
+        if packages:
+            located, unlocated = Packages.DLLs.resolve_graph(str(TARGET), packages)
+            for package in packages:
+                copied_dlls |= package.duplicate_required_dlls(str(TARGET),
+                                                               located[package])
+        return copied_dlls
@@ -0,0 +1,28 @@
+import os
+import importlib
+from functools import lru_cache
+from Packages.Settings import settings
+
+# Each backend: its name, and its module and class.  Only the module of the backend in use
+# is imported.
+_BACKENDS = [
+    ("msvc", "Packages.MSVCBackend", "MSVC"),
+    ("clang-cl", "Packages.MSVCBackend", "ClangCL"),
+    ("native", "Packages.NativeBackend", "Native"),
+]
+
+# An environment variable which overrides the backend setting:
+BACKEND_ENV_VAR = 'INVOKE_MSVC_BACKEND'
+
+
+@lru_cache
+def current():
+    """
+    The backend of INVOKE_MSVC_BACKEND or the backend setting, msvc by default.  See
+    Packages.IBackend.
+    """
+    name = os.environ.get(BACKEND_ENV_VAR) or settings().get('backend', 'msvc')
+    for backend_name, module_name, class_name in _BACKENDS:
+        if backend_name == name:
+            return getattr(importlib.import_module(module_name), class_name)()
+    raise Exception(f"Unknown backend: {name}")
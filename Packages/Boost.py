@@ -1,10 +1,10 @@
 import os
 import re
 import json
-from overrides import overrides
 from pathlib import Path
 from functools import lru_cache
-from Packages.IPackage import IPackage
+from Packages.IPackage import IPackage, overrides
+from Packages.LibIndex import libs_with_prefix
 
 class Boost(IPackage):
     """
@@ -57,19 +57,14 @@ class Boost(IPackage):
                     unused_argv.append(arg)
         self._argv = unused_argv  # Keep the args not used in this package.
 
-        # Compose the filename regex for the requested Boost libs:
-        re_lib_filenames = list()
-        for l in requested_libs:
-            re_lib_filenames.append(re.compile(f".+{l}-.+\\.lib"))
-
-        # Find the Boost release lib files:
+        # Find the Boost release lib files in the index of the lib dir.  Boost names its
+        # libs boost_<name>-<toolset>-... and, for static libs, libboost_<name>-...
         re_debug_version_lib = re.compile(self._lib_debug_version_regex_str)
         self._debug_libs = list()  # List of Paths to Boost debug lib files.
         self._release_libs = list()
-        for f in sorted(self.lib_dir.glob('*.lib')):
-            fstr = str(f)
-            for re_lib_filename in re_lib_filenames:
-                if re_lib_filename.match(fstr):
+        for l in requested_libs:
+            for prefix in [f"boost_{l}-", f"libboost_{l}-"]:
+                for fstr in libs_with_prefix(self.lib_dir, prefix):
                     if re_debug_version_lib.match(fstr):
                         self._debug_libs.append(fstr)
                     else:
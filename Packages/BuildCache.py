@@ -0,0 +1,162 @@
+import shutil
+import logging
+from pathlib import Path
+from functools import lru_cache
+import Packages.Backends as Backends
+import Packages.Deploy
+import Packages.Depends as Depends
+from Packages.Cache import LRUCache, hash_file, hash_strings
+from Packages.Settings import settings
+
+
+@lru_cache
+def _cache() -> LRUCache:
+    return LRUCache('build', settings().get('build_cache_mb', 2048))
+
+
+@lru_cache
+def _obj_cache() -> LRUCache:
+    return LRUCache('obj', settings().get('obj_cache_mb', 2048))
+
+
+@lru_cache
+def _deps_cache() -> LRUCache:
+    return LRUCache('deps', settings().get('deps_cache_mb', 64))
+
+
+def is_enabled() -> bool:
+    """
+    Should targets be restored from, and saved to, the build cache?
+    """
+    return settings().get('build_cache', True)
+
+
+def _masked(clo : list[str], paths : dict[Path, str]) -> list[str]:
+    """
+    The command line with the given paths replaced by placeholders, and with the size and
+    mtime of each lib file, so that a rebuilt lib changes the key.  Org mode writes each
+    evaluation into freshly named temp files, so their paths must not be in a key.
+    """
+    masked = list()
+    for arg in clo:
+        for path, placeholder in paths.items():
+            arg = arg.replace(str(path), placeholder)
+        masked.append(arg)
+        if arg.endswith('.lib') and Path(arg).is_file():
+            st = Path(arg).stat()
+            masked.append(f'{st.st_size}:{st.st_mtime_ns}')
+    return masked
+
+
+def source_key(compile_clo : list[str], src : Path) -> str:
+    """
+    The key of the dependency manifest of src: the compiler command line, the source and
+    the identity of the compiler.  The headers are known only once src is compiled, so
+    they are recorded in the manifest instead.
+    """
+    key = _masked(compile_clo, {src: '<SRC>'})
+    key.append(hash_file(src))
+    key.append(Backends.current().toolchain_identity())
+    return hash_strings(key)
+
+
+def _compile_key(source_key : str, manifest : list[list]) -> str:
+    return hash_strings([source_key] + Depends.digest(manifest))
+
+
+def compile_key(source_key : str) -> str | None:
+    """
+    The key of the object file of src in the object cache: its source key and the
+    contents of every header it included when it was last compiled.  None if src has not
+    been compiled with this source key, or if any of its headers has changed since.
+    """
+    if _deps_cache().get(source_key) is None:
+        return None
+    manifest = _deps_cache().meta(source_key)['headers']
+    if not Depends.is_up_to_date(manifest):
+        return None
+    return _compile_key(source_key, manifest)
+
+
+def record_dependencies(source_key : str, headers : list[Path]) -> str:
+    """
+    Save the manifest of the headers which the compiler reported for src, and return
+    the key of its object file.
+    """
+    manifest = Depends.record(headers)
+    _deps_cache().put(source_key, {}, {'headers': manifest}, replace=True)
+    logging.debug("Recorded %s dependencies for %s", len(manifest), source_key)
+    return _compile_key(source_key, manifest)
+
+
+def link_key(compile_key : str, link_clo : list[str], objs : list[Path],
+             target : Path) -> str:
+    """
+    The key of the target in the build cache: the key of its object file and the linker
+    inputs.  A change to only the libs or linker options of a block keeps the object.
+    """
+    key = [compile_key]
+    key += _masked(link_clo, {target: '<TARGET>', **{obj: '<OBJ>' for obj in objs}})
+    key.append(Backends.current().toolchain_identity())
+    return hash_strings(key)
+
+
+def cached_obj(key : str) -> Path | None:
+    """
+    The cached object file of the given compile key, if there is one.
+    """
+    entry_dir = _obj_cache().get(key)
+    if entry_dir is None:
+        return None
+    return entry_dir / 'target.obj'
+
+
+def stage_obj(key : str) -> Path:
+    """
+    The path for the compiler to write the object file of the given source key to.
+    Once written, it is saved in the object cache under its compile key by commit_obj().
+    """
+    return _obj_cache().stage(key) / 'target.obj'
+
+
+def commit_obj(key : str, staged_obj : Path) -> Path:
+    """
+    Save the staged object file in the object cache, and return its cached path.
+    """
+    return _obj_cache().commit(key, staged_obj.parent) / 'target.obj'
+
+
+def discard_obj(staged_obj : Path):
+    """
+    Discard the staging directory of an object file which failed to compile.
+    """
+    shutil.rmtree(staged_obj.parent, ignore_errors=True)
+
+
+def restore(key : str, target : Path) -> set[Path] | None:
+    """
+    Restore the target executable, and the DLLs which were copied beside it, from the
+    build cache.  Return the DLLs, or None if there is no usable cache entry.
+    """
+    entry_dir = _cache().get(key)
+    if entry_dir is None:
+        return None
+    meta = _cache().meta(key)
+    dlls = [Path(d) for d in meta['dlls']]
+    if not all(d.exists() for d in dlls):
+        logging.debug("Build cache entry %s refers to missing DLLs.", key)
+        return None
+    shutil.copy2(entry_dir / meta['target'], target)
+    Packages.Deploy.deploy(set(dlls), target.parent)
+    logging.debug("Restored from build cache: %s", target)
+    return set(dlls)
+
+
+def store(key : str, target : Path, dlls : set[Path]):
+    """
+    Save the target executable in the build cache, with the DLLs which were copied beside
+    it.  Only the locations of the DLLs are saved, since they are restored from there.
+    """
+    meta = {'target': target.name, 'dlls': sorted(str(d) for d in dlls)}
+    _cache().put(key, {target.name: target}, meta)
+    logging.debug("Saved in build cache: %s", target)
@@ -1,10 +1,9 @@
 import os
 import re
 import json
-from overrides import overrides
 from pathlib import Path
 from functools import lru_cache
-from Packages.IPackage import IPackage
+from Packages.IPackage import IPackage, overrides
 
 class CMake(IPackage):
     """
@@ -0,0 +1,296 @@
+import os
+import json
+import atexit
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from Packages.Settings import cache_dir, settings
+from Packages.FileLock import FileLock, staging_path
+
+
+def hash_file(path : Path) -> str:
+    """
+    The SHA-256 hex digest of the contents of the given file.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return(h.hexdigest())
+
+
+def hash_strings(strings : list[str]) -> str:
+    """
+    The SHA-256 hex digest of the given list of strings.
+    """
+    h = hashlib.sha256()
+    for s in strings:
+        h.update(s.encode('utf-8'))
+        h.update(b'\0')
+    return(h.hexdigest())
+
+
+_caches = list()  # The LRUCaches of this process, whose counts save_counts() saves.
+
+
+def save_counts():
+    """
+    Add the hit, miss and eviction counts of this process to the persistent counters of
+    its caches.  This is done at exit, and by the workers of batch.py after each job,
+    since atexit handlers do not run in them.
+    """
+    for cache in _caches:
+        cache._save_counts()
+
+
+atexit.register(save_counts)
+
+
+class LRUCache:
+    """
+    A persistent, size-bounded store of files on disk.  Each entry is a directory named by
+    its key, which holds the cached files and a meta.json file.  The mtime of meta.json
+    records the last use of the entry, so the least recently used entries are evicted
+    first when the store grows beyond max_mb.
+    """
+
+    def __init__(self, name : str, max_mb : int):
+        self._name = name
+        self._dir = cache_dir(name)
+        self._max_bytes = max_mb * 1024 * 1024
+        self._stats_path = self._dir / 'stats.json'
+        self._counts = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._counts_lock = threading.Lock()
+        _caches.append(self)
+
+    @property
+    def dir(self) -> Path:
+        return self._dir
+
+    def _entry_dir(self, key : str) -> Path:
+        return self._dir / key
+
+    def _count(self, counter : str):
+        """
+        Increment a counter of this process and write the counters to the log.  The
+        counts are added to the persistent counters once, at exit.
+        """
+        with self._counts_lock:
+            self._counts[counter] += 1
+            counts = dict(self._counts)
+        logging.info("%s cache %s: hits == %s, misses == %s, evictions == %s", self._name,
+                     counter, counts['hits'], counts['misses'], counts['evictions'])
+
+    def _save_counts(self):
+        """
+        Add the counts of this process to the persistent counters.  The counters are
+        locked while they are updated, so no count of another process is lost.
+        """
+        with self._counts_lock:
+            counts = dict(self._counts)
+            self._counts = dict.fromkeys(counts, 0)
+        if not any(counts.values()):
+            return
+        with FileLock(self._stats_path):
+            stats = dict.fromkeys(counts, 0)
+            if self._stats_path.exists():
+                try:
+                    with open(self._stats_path) as f:
+                        stats.update(json.load(f))
+                except ValueError:
+                    pass
+            for counter, count in counts.items():
+                stats[counter] += count
+            tmp_path = staging_path(self._stats_path)
+            with open(tmp_path, 'w') as f:
+                json.dump(stats, f)
+            os.replace(tmp_path, self._stats_path)
+
+    def get(self, key : str) -> Path | None:
+        """
+        The directory of the cached entry, or None if there is no such entry.
+        """
+        meta_path = self._entry_dir(key) / 'meta.json'
+        if meta_path.exists():
+            os.utime(meta_path)  # Mark as most recently used.
+            self._count('hits')
+            return self._entry_dir(key)
+        self._count('misses')
+        return None
+
+    def meta(self, key : str) -> dict:
+        """
+        The meta data stored with the cached entry.
+        """
+        with open(self._entry_dir(key) / 'meta.json') as f:
+            return(json.load(f))
+
+    def stage(self, key : str) -> Path:
+        """
+        An empty staging directory in which to build the files of an entry for key.
+        """
+        staging_dir = staging_path(self._dir / key)
+        if staging_dir.exists():
+            shutil.rmtree(staging_dir)
+        staging_dir.mkdir()
+        return staging_dir
+
+    def commit(self, key : str, staging_dir : Path, meta : dict | None = None,
+               replace : bool = False) -> Path:
+        """
+        Make the staging directory the entry for key.  The directory is renamed, so
+        readers never see a partial entry.  An entry committed before is kept, since it
+        may be in use, and the staging directory is discarded, unless replace is set, as
+        when the entry is out of date.  It is then renamed aside, rather than removed, and
+        removed by evict() once it is no longer used.
+        """
+        entry_dir = self._entry_dir(key)
+        with open(staging_dir / 'meta.json', 'w') as f:
+            json.dump(meta if meta is not None else dict(), f)
+        if replace and entry_dir.exists():
+            try:
+                entry_dir.rename(staging_path(self._dir / (key + '.retired')))
+            except OSError:
+                pass  # In use on Windows, or retired by another process.
+        try:
+            staging_dir.rename(entry_dir)
+        except OSError:
+            # Another process won the race:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        self.evict()
+        return entry_dir
+
+    def put(self, key : str, files : dict[str, Path], meta : dict | None = None,
+            replace : bool = False) -> Path:
+        """
+        Store copies of the given files under key.  The files are named by the keys of the
+        files dict.
+        """
+        staging_dir = self.stage(key)
+        for name, path in files.items():
+            shutil.copy2(path, staging_dir / name)
+        return self.commit(key, staging_dir, meta, replace)
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the store fits within max_mb.  The
+        store is locked meanwhile.  An entry used within the last cache_grace_seconds may
+        still be in use by another process, so it is kept, and so are the staging and
+        retired directories of that age.  An entry is renamed aside before it is removed,
+        so readers never see a partial entry, and one which cannot be renamed, because
+        its files are open on Windows, is kept.
+        """
+        grace_seconds = settings().get('cache_grace_seconds', 3600)
+        now = time.time()
+        with FileLock(self._dir):
+            entries = list()
+            total_bytes = 0
+            for entry_dir in self._dir.iterdir():
+                if not entry_dir.is_dir():
+                    continue
+                meta_path = entry_dir / 'meta.json'
+                if '.tmp' in entry_dir.name:
+                    # A retired entry, or the staging directory of a build which died:
+                    if now - entry_dir.stat().st_mtime > grace_seconds:
+                        shutil.rmtree(entry_dir, ignore_errors=True)
+                    continue
+                if not meta_path.exists():
+                    continue
+                entry_bytes = sum(f.stat().st_size for f in entry_dir.iterdir())
+                entries.append((meta_path.stat().st_mtime, entry_bytes, entry_dir))
+                total_bytes += entry_bytes
+            entries.sort()
+            for last_use, entry_bytes, entry_dir in entries:
+                if total_bytes <= self._max_bytes or now - last_use <= grace_seconds:
+                    break
+                evicted_dir = staging_path(self._dir / (entry_dir.name + '.evicted'))
+                try:
+                    entry_dir.rename(evicted_dir)
+                except OSError:
+                    continue
+                shutil.rmtree(evicted_dir, ignore_errors=True)
+                total_bytes -= entry_bytes
+                self._count('evictions')
+                logging.debug("Evicted from %s cache: %s", self._name, entry_dir.name)
+
+
+class JsonStore:
+    """
+    A persistent dict in a json file, such as an index of what was read from files, which
+    processes share.  It is read again whenever the file changes, so a long-lived process,
+    such as the compile server, sees what others added, and what this process adds is
+    merged into the file as it is then, so no process writes over what another added.
+    A store of at most max_entries is keyed by paths: when it grows beyond that, the
+    entries of the paths which are gone are dropped, and then the least recently set.
+    """
+
+    def __init__(self, path : Path, max_entries : int | None = None):
+        self._path = path
+        self._max_entries = max_entries
+        self._entries = dict()
+        self._added = dict()  # What this process added since the last save.
+        self._mtime_ns = None
+
+    def _read(self) -> dict:
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return dict()
+        except ValueError:
+            logging.debug("Ignored corrupt %s", self._path)
+            return dict()
+
+    def _refresh(self):
+        try:
+            mtime_ns = self._path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime_ns != self._mtime_ns:
+            self._entries = self._read()
+            self._entries.update(self._added)
+            self._mtime_ns = mtime_ns
+
+    def get(self, key : str):
+        self._refresh()
+        return self._entries.get(key)
+
+    def set(self, key : str, value):
+        self._entries[key] = value
+        self._added[key] = value
+
+    def save(self):
+        """
+        Merge what this process added into the file.
+        """
+        if not self._added:
+            return
+        with FileLock(self._path):
+            entries = self._read()
+            for key, value in self._added.items():
+                entries.pop(key, None)  # So the entries stay in the order they were set.
+                entries[key] = value
+            if self._max_entries is not None and len(entries) > self._max_entries:
+                entries = self._pruned(entries)
+            tmp_path = staging_path(self._path)
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self._path)
+            self._mtime_ns = self._path.stat().st_mtime_ns
+        self._entries = entries
+        self._added = dict()
+
+    def _pruned(self, entries : dict) -> dict:
+        """
+        The entries whose paths still exist, less the least recently set of them, down to
+        three quarters of max_entries, so the store is not pruned again at every save.
+        """
+        entries = {key: value for key, value in entries.items() if os.path.exists(key)}
+        excess = len(entries) - self._max_entries * 3 // 4
+        if excess > 0 and len(entries) > self._max_entries:
+            entries = dict(list(entries.items())[excess:])
+        logging.debug("Pruned %s to %s entries.", self._path, len(entries))
+        return entries
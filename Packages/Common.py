@@ -1,13 +1,14 @@
 import os
 import json
-from overrides import overrides
 from pathlib import Path
-from Packages.IPackage import IPackage
+import Packages.Backends as Backends
+from Packages.IPackage import IPackage, overrides
 
 
 class Common(IPackage):
     """
-    Common compiler and linker command line options for cl.exe.
+    Common compiler and linker command line options, for cl.exe or the compiler of
+    another backend.
     """
 
     def __init__(self, argv : list[str] = []):
@@ -18,19 +19,20 @@ class Common(IPackage):
         self._debug_libs = list()
         self._release_libs = list()
 
-        # Replace linker flags for cl.exe command line:
+        # Replace linker flags for the command line of the backend:
+        backend = Backends.current()
         self._linker_options = list()
         unused_argv = list()  # argv without Boost options.
         for arg in self._argv:
             if arg.startswith("-L"):
-                self._linker_options.append(arg.replace("-L", "/LIBPATH:"))
+                self._linker_options.append(backend.lib_dir_option(arg[len("-L"):]))
             else:
                 unused_argv.append(arg)
         self._argv = unused_argv  # Keep the args not used in this package.
 
         # Compiler options read from json file:
         script_filename = Path(os.path.realpath(__file__))
-        user_options_filename = script_filename.with_name('common.json')
+        user_options_filename = script_filename.with_name(backend.common_options_file)
         with open(user_options_filename) as user_options_file:
             user_options = json.load(user_options_file)
         self._defines = user_options['defines']
@@ -39,7 +41,7 @@ class Common(IPackage):
         self._linker_options += user_options['linker_options']
         self._compiler_options = list()
         for co in user_options['compiler_options']:
-            self._compiler_options.append("/" + co)
+            self._compiler_options.append(backend.option_prefix + co)
 
     @property
     @overrides
@@ -96,5 +98,5 @@ class Common(IPackage):
         return set()
 
     @overrides
-    def duplicate_required_dlls(self, target : str):
-        pass
+    def duplicate_required_dlls(self, target : str, dlls : set[str] = None) -> set[str]:
+        return set()
@@ -1,11 +1,13 @@
 import os
-import re
 import json
-import subprocess
+import time
 import logging
-import shutil
+import Packages.Backends as Backends
+import Packages.Timing as Timing
 from pathlib import Path
 from functools import lru_cache
+from Packages.Cache import JsonStore
+from Packages.Settings import cache_dir
 
 
 @lru_cache
@@ -35,23 +37,90 @@ def _remove_system_dlls(dll_list : list[str]) -> set[str]:
 
 
 
-def required_by_target(target : str) -> set[str]:
+class _ImportCache:
     """
-    Find out which DLLs are required by the given target executable.
+    A persistent cache of the DLLs imported by each DLL, keyed by the path, size and mtime
+    of the DLL.  A DLL which is replaced, say by installing a new port, is read again.
+    """
+
+    def __init__(self):
+        self._store = JsonStore(cache_dir('dlls') / 'imports.json')
+
+    def imported_dlls(self, path : Path) -> list[str]:
+        st = path.stat()
+        entry = self._store.get(str(path))
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        dll_list = Backends.current().imported_libraries(path)
+        self._store.set(str(path), [st.st_size, st.st_mtime_ns, dll_list])
+        return dll_list
+
+    def save(self):
+        self._store.save()
+
+
+@lru_cache
+def _import_cache() -> _ImportCache:
+    return _ImportCache()
+
+
+def required_by_target(target : str, use_cache : bool = False) -> set[str]:
+    """
+    Find out which DLLs are required by the given target executable.  The import tables
+    of the target are read directly, so dumpbin need not be run.  Installed DLLs may use
+    the persistent import cache, but temporary targets should not.
     """
     TARGET = Path(target).resolve() # The target executable.
-    dumpbin_exe = shutil.which('dumpbin')
-    if dumpbin_exe is None:
-        raise Exception('No such executable: dumpbin')
-    logging.debug("dumpbin == {}".format(dumpbin_exe))
-    dumpbin_clo = [dumpbin_exe, "/IMPORTS", str(TARGET)]
-    cp = subprocess.run(dumpbin_clo, capture_output=True, text=True)
-    dll_list = re.findall(r'[^ \t]+\.dll', cp.stdout) # Assumes DLL filename has no spaces.
-    logging.debug("dll_list == {}".format(dll_list))
+    with Timing.span('required_by_target', target=str(TARGET)):
+        if use_cache:
+            dll_list = _import_cache().imported_dlls(TARGET)
+        else:
+            dll_list = Backends.current().imported_libraries(TARGET)
+    logging.debug("dll_list == %s", dll_list)
     dlls_to_be_copied = _remove_system_dlls(dll_list)
-    logging.debug("dlls_to_be_copied == {}".format(dlls_to_be_copied))
+    logging.debug("dlls_to_be_copied == %s", dlls_to_be_copied)
     if TARGET.name in dlls_to_be_copied:
         dlls_to_be_copied.remove(TARGET.name)
     if str(TARGET) in dlls_to_be_copied:
         dlls_to_be_copied.remove(str(TARGET))
     return(dlls_to_be_copied)
+
+
+
+def resolve_graph(target : str, packages : list) -> tuple[dict, set[str]]:
+    """
+    Walk the graph of DLLs required by the target executable, visiting each DLL only once
+    no matter how many DLLs depend upon it.  Each DLL is located in the dll_dir of the
+    first of the given packages which has it.  Return a dict of each package to the set
+    of its located DLLs, and the set of DLL names which could not be located.
+    """
+    start_time = time.perf_counter()
+    located = {package: set() for package in packages}
+    unlocated = set()
+    graph = dict()  # Each visited binary to the DLLs it requires.
+    visited = set()  # Lowercase DLL names, since Windows ignores case.
+    pending = [(Path(target), False)]
+    while pending:
+        binary, use_cache = pending.pop()
+        required = sorted(required_by_target(str(binary), use_cache))
+        graph[binary.name] = required
+        for dll in required:
+            if dll.lower() in visited:
+                continue
+            visited.add(dll.lower())
+            for package in packages:
+                dll_path = package.dll_dir / dll
+                if dll_path.exists():
+                    located[package].add(dll_path)
+                    pending.append((dll_path, True))
+                    break
+            else:
+                unlocated.add(dll)
+    _import_cache().save()
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        for binary, required in graph.items():
+            logging.debug("DLL graph: %s -> %s", binary, required)
+    logging.debug("Unlocated DLLs: %s", unlocated)
+    logging.debug("Resolved %s DLLs in %.3f s.", len(visited),
+                  time.perf_counter() - start_time)
+    return located, unlocated
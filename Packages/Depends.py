@@ -0,0 +1,124 @@
+import os
+import re
+import logging
+from pathlib import Path
+from functools import lru_cache
+from Packages.Cache import JsonStore, hash_file
+from Packages.Settings import cache_dir, settings
+
+
+def note_regex() -> re.Pattern:
+    """
+    The pattern of the notes which cl.exe prints for /showIncludes.  The text of the note
+    depends on the language of the compiler, so it may be set with show_includes_note.
+    """
+    return _compile_note(settings().get('show_includes_note', 'Note: including file:'))
+
+
+@lru_cache(maxsize=1)
+def _compile_note(note : str) -> re.Pattern:
+    return re.compile(r'^' + re.escape(note) + r'\s*(.+?)\s*$')
+
+
+def included_header(line : str, regex : re.Pattern | None = None) -> Path | None:
+    """
+    The header named by a line of the output of cl.exe /showIncludes, or None if the line
+    is not an include note.  The regex is that of note_regex(), which a caller going
+    through many lines gets once.
+    """
+    m = (regex or note_regex()).match(line)
+    if m:
+        return Path(m.group(1)).resolve()
+    return None
+
+
+def parse_show_includes(output : str) -> tuple[list[Path], str]:
+    """
+    Split the output of cl.exe /showIncludes into the headers it included, in order and
+    without duplicates, and the rest of its output.
+    """
+    regex = note_regex()
+    headers = dict()
+    rest = list()
+    for line in output.splitlines(keepends=True):
+        header = included_header(line, regex)
+        if header is not None:
+            headers.setdefault(header, None)
+        else:
+            rest.append(line)
+    return list(headers), ''.join(rest)
+
+
+class _HashCache:
+    """
+    A persistent cache of the hash of each header, keyed by its path, size and mtime, so
+    the headers shared by many blocks, such as those of the standard library, are hashed
+    only once.  It keeps at most header_hash_entries headers.
+    """
+
+    def __init__(self):
+        self._store = JsonStore(cache_dir('headers') / 'hashes.json',
+                                settings().get('header_hash_entries', 20000))
+
+    def hash(self, path : Path, st : os.stat_result) -> str:
+        entry = self._store.get(str(path))
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        h = hash_file(path)
+        self._store.set(str(path), [st.st_size, st.st_mtime_ns, h])
+        return h
+
+    def save(self):
+        self._store.save()
+
+
+@lru_cache
+def _hash_cache() -> _HashCache:
+    return _HashCache()
+
+
+def record(headers : list[Path]) -> list[list]:
+    """
+    The dependency manifest of the given headers: the path, size, mtime and content hash
+    of each.
+    """
+    manifest = list()
+    for header in headers:
+        st = header.stat()
+        manifest.append([str(header), st.st_size, st.st_mtime_ns,
+                         _hash_cache().hash(header, st)])
+    _hash_cache().save()
+    return manifest
+
+
+def is_up_to_date(manifest : list[list]) -> bool:
+    """
+    Are all the headers of the manifest unchanged?  Only the recorded files are looked
+    at, with the cheapest checks first: each is stat'ed, and only a header whose mtime
+    has changed but not its size is hashed again.
+    """
+    up_to_date = True
+    for path, size, mtime_ns, h in manifest:
+        try:
+            st = os.stat(path)
+        except OSError:
+            logging.debug("Dependency removed: %s", path)
+            up_to_date = False
+            break
+        if st.st_size != size:
+            logging.debug("Dependency changed size: %s", path)
+            up_to_date = False
+            break
+        if st.st_mtime_ns != mtime_ns and _hash_cache().hash(Path(path), st) != h:
+            logging.debug("Dependency changed: %s", path)
+            up_to_date = False
+            break
+    _hash_cache().save()
+    return up_to_date
+
+
+def digest(manifest : list[list]) -> list[str]:
+    """
+    The paths and content hashes of the manifest, for a cache key.
+    """
+    return [f'{path}:{h}' for path, _, _, h in manifest]
@@ -0,0 +1,93 @@
+import os
+import shutil
+import logging
+from pathlib import Path
+import Packages.Timing as Timing
+from Packages.FileLock import FileLock, staging_path
+from Packages.Settings import settings
+
+_FICLONE = 0x40049409  # Linux ioctl to clone the extents of a file (a reflink).
+
+
+def _is_up_to_date(src : Path, dest : Path) -> bool:
+    """
+    Is dest already a copy of, or a link to, src?  A copy made by shutil.copy2 keeps the
+    size and mtime of its source.
+    """
+    if not dest.exists():
+        return False
+    src_stat = src.stat()
+    dest_stat = dest.stat()
+    if src_stat.st_ino != 0 and os.path.samestat(src_stat, dest_stat):
+        return True
+    return src_stat.st_size == dest_stat.st_size and \
+        src_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+
+def _reflink(src : Path, dest : Path) -> bool:
+    """
+    Clone src into dest without copying its bytes, where the file system allows it.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, 'rb') as fsrc, open(dest, 'wb') as fdest:
+            fcntl.ioctl(fdest.fileno(), _FICLONE, fsrc.fileno())
+    except OSError:
+        dest.unlink(missing_ok=True)
+        return False
+    shutil.copystat(src, dest)
+    return True
+
+
+def _place(src : Path, dest : Path) -> str:
+    """
+    Put src at dest by the cheapest means: a hardlink, then a reflink, then a copy.  The
+    file is staged beside dest and renamed over it, so dest is never half written.
+    Return the means used.
+    """
+    staged = staging_path(dest)
+    staged.unlink(missing_ok=True)
+    method = 'copy'
+    if settings().get('dll_links', True):
+        try:
+            os.link(src, staged)
+            method = 'hardlink'
+        except OSError:
+            if _reflink(src, staged):
+                method = 'reflink'
+    if method == 'copy':
+        shutil.copy2(src, staged)
+    os.replace(staged, dest)
+    return method
+
+
+def deploy(dlls : set[Path], dest_dir : Path) -> set[Path]:
+    """
+    Put each of the given DLLs into dest_dir, skipping those already there.  Each DLL is
+    locked while it is checked and placed, since the targets of other blocks in dest_dir
+    may be deploying it at the same time.  Return the locations of the DLLs, as given.
+    """
+    avoided_bytes = 0
+    copied_bytes = 0
+    for dll in sorted(dlls):
+        src = Path(dll)
+        dest = dest_dir / src.name
+        size = src.stat().st_size
+        with FileLock(dest):
+            if _is_up_to_date(src, dest):
+                avoided_bytes += size
+                logging.debug("Up to date DLL: %s", str(dest))
+                continue
+            with Timing.span('deploy DLL', dll=src.name, bytes=size):
+                method = _place(src, dest)
+        if method == 'copy':
+            copied_bytes += size
+        else:
+            avoided_bytes += size
+        logging.debug("Deployed required DLL by %s: %s", method, str(src))
+    logging.debug("DLL deployment copied %s bytes and avoided copying %s bytes.",
+                  copied_bytes, avoided_bytes)
+    return set(dlls)
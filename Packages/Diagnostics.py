@@ -0,0 +1,144 @@
+import re
+import sys
+import logging
+import subprocess
+from pathlib import Path
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import Packages.Depends as Depends
+from Packages.Settings import settings
+
+# The first line of each diagnostic of cl.exe or link.exe, or of clang or gcc, which have
+# no codes.  The lines which follow it, such as the notes of a template error, belong to
+# it.
+_diagnostic_regex = re.compile(r'\b(fatal error|error|warning)( (C|LNK|D)\d+)?\s*:')
+
+
+@dataclass
+class ToolOutput:
+    """
+    What a run of cl.exe or link.exe left: its exit code, the output which was kept, the
+    headers it reported for /showIncludes, and the number of diagnostics of each kind.
+    """
+    returncode : int
+    text : str
+    headers : list[Path] = field(default_factory=list)
+    errors : int = 0
+    warnings : int = 0
+    omitted : int = 0  # The diagnostics beyond max_diagnostics, which were not kept.
+    left_out : int = 0  # The lines beyond max_output_kb, which were not kept.
+    stopped : bool = False  # Was the tool cut off at its first error?
+    report : list[str] = field(default_factory=list)  # The lines of its timing reports.
+
+    def summary(self) -> str:
+        """
+        A short account of the run, for the error raised when it fails.  Its diagnostics
+        were already shown as they arrived, so they are not repeated.
+        """
+        counts = [f'{self.errors} error' + ('' if self.errors == 1 else 's'),
+                  f'{self.warnings} warning' + ('' if self.warnings == 1 else 's')]
+        if self.stopped:
+            return ', '.join(['cut off at the first error'] + counts)
+        return ', '.join([f'exit code {self.returncode}'] + counts)
+
+
+def _echo(line : str):
+    sys.stderr.write(line)
+    sys.stderr.flush()
+
+
+def report(tool : str, text : str, result : ToolOutput = None):
+    """
+    Show and log the output which a tool wrote elsewhere, such as on a build agent.  Its
+    diagnostics are counted in result, if given.
+    """
+    for line in text.splitlines(keepends=True):
+        logging.info("%s: %s", Path(tool).name, line.rstrip())
+        _echo(line)
+        m = _diagnostic_regex.search(line)
+        if m and result is not None:
+            if m.group(1) == 'warning':
+                result.warnings += 1
+            else:
+                result.errors += 1
+
+
+def run_tool(clo : list[str], cwd : str = None, echo : bool = True,
+             fail_fast : bool = False,
+             is_report_line : Callable[[str], bool] = None) -> ToolOutput:
+    """
+    Run cl.exe or link.exe and stream its output as it arrives: to stderr, which Emacs
+    shows, if echo is set, and to the log.  Include notes are collected rather than shown,
+    and so are the lines of timing reports, if is_report_line is given to tell them.
+    Only the first max_diagnostics diagnostics, and at most max_output_kb of output, are
+    kept and shown, with a note of what was left out, and the rest is logged at DEBUG
+    level.  With fail_fast, the tool is cut off at its first error.
+    """
+    max_diagnostics = settings().get('max_diagnostics', 20)
+    max_chars = settings().get('max_output_kb', 256) * 1024
+    result = ToolOutput(0, '')
+    headers = dict()
+    kept = list()
+    kept_chars = 0
+    left_out_bytes = 0
+    diagnostics = 0
+    # cl.exe first prints the name of each source, which is not worth showing:
+    sources = {Path(arg).name for arg in clo if arg.endswith(('.cpp', '.c', '.i'))}
+    p = subprocess.Popen(clo, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                         stdin=subprocess.DEVNULL, text=True, errors='replace', bufsize=1)
+    note_regex = Depends.note_regex()
+    with p:
+        for line in p.stdout:
+            header = Depends.included_header(line, note_regex)
+            if header is not None:
+                headers.setdefault(header, None)
+                continue
+            if line.strip() in sources:
+                continue
+            if is_report_line is not None and is_report_line(line):
+                result.report.append(line)
+                continue
+            m = _diagnostic_regex.search(line)
+            if m:
+                diagnostics += 1
+                if m.group(1) == 'warning':
+                    result.warnings += 1
+                else:
+                    result.errors += 1
+                if diagnostics > max_diagnostics:
+                    result.omitted += 1
+            if diagnostics > max_diagnostics:
+                logging.debug("%s: %s", Path(clo[0]).name, line.rstrip())
+            elif result.left_out or kept_chars + len(line) > max_chars:
+                # Once one line is left out, so are all those after it:
+                result.left_out += 1
+                left_out_bytes += len(line.encode('utf-8', errors='replace'))
+                logging.debug("%s: %s", Path(clo[0]).name, line.rstrip())
+            else:
+                kept.append(line)
+                kept_chars += len(line)
+                logging.info("%s: %s", Path(clo[0]).name, line.rstrip())
+                if echo:
+                    _echo(line)
+            if fail_fast and result.errors:
+                logging.info("Cut off %s at its first error.", Path(clo[0]).name)
+                result.stopped = True
+                p.kill()
+                break
+    result.returncode = p.wait()
+    if result.stopped and result.returncode == 0:
+        result.returncode = 1
+    notes = list()
+    if result.left_out:
+        notes.append(f'... {result.left_out} more lines, {left_out_bytes} bytes, were '
+                     f'left out beyond max_output_kb.\n')
+    if result.omitted:
+        notes.append(f'... {result.omitted} more diagnostics were left out.\n')
+    for note in notes:
+        logging.info("%s: %s", Path(clo[0]).name, note.rstrip())
+        kept.append(note)
+        if echo:
+            _echo(note)
+    result.text = ''.join(kept)
+    result.headers = list(headers)
+    return result
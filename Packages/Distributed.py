@@ -0,0 +1,109 @@
+import os
+import time
+import base64
+import socket
+import logging
+from pathlib import Path
+from Packages.Settings import settings
+from Packages.Wire import send_message, receive_messages
+
+# An environment variable which overrides the build_agents setting, with the agents
+# separated by commas:
+AGENTS_ENV_VAR = 'INVOKE_MSVC_BUILD_AGENTS'
+
+# The options of cl.exe which only matter to the preprocessor, which has already run:
+_PREPROCESSOR_OPTIONS = ('/I', '/D', '/U', '/FI')
+
+_down_until = dict()  # The agents which failed, and until when they are not asked again.
+
+
+def agents() -> list[str]:
+    """
+    The build agents, each as host:port.
+    """
+    value = os.environ.get(AGENTS_ENV_VAR)
+    if value is not None:
+        return [a.strip() for a in value.split(',') if a.strip()]
+    return list(settings().get('build_agents', []))
+
+
+def is_enabled() -> bool:
+    return bool(agents())
+
+
+def _address(agent : str) -> tuple[str, int]:
+    host, _, port = agent.rpartition(':')
+    return host, int(port)
+
+
+def _mark_down(agent : str, reason):
+    logging.info("Build agent %s is down: %s", agent, reason)
+    _down_until[agent] = time.monotonic() + settings().get('agent_retry_seconds', 60)
+
+
+def _request(agent : str, message : dict, timeout : float | None) -> dict:
+    """
+    Send one request to an agent and return its reply.
+    """
+    message = dict(message, token=settings().get('agent_token', ''))
+    connect_timeout = settings().get('agent_timeout_seconds', 3)
+    with socket.create_connection(_address(agent), timeout=connect_timeout) as sock:
+        sock.settimeout(timeout)
+        send_message(sock, message)
+        reply = next(receive_messages(sock), None)
+    if reply is None:
+        raise OSError('The agent closed the connection.')
+    if 'error' in reply:
+        raise OSError(reply['error'])
+    return reply
+
+
+def _least_loaded() -> str | None:
+    """
+    Ask each agent which is not known to be down for its load, and return the one with
+    the most free slots for its size.  None if every agent is down or busy.
+    """
+    best, best_load = None, None
+    for agent in agents():
+        if _down_until.get(agent, 0) > time.monotonic():
+            continue
+        try:
+            status = _request(agent, {'status': True},
+                              settings().get('agent_timeout_seconds', 3))
+        except (OSError, ValueError) as e:
+            _mark_down(agent, e)
+            continue
+        if status['running'] >= status['slots']:
+            continue
+        load = status['running'] / status['slots']
+        if best is None or load < best_load:
+            best, best_load = agent, load
+    return best
+
+
+def compile_remotely(cl_clo : list[str], preprocessed : Path, src : Path,
+                     obj : Path) -> tuple[int, str] | None:
+    """
+    Compile the preprocessed source of src on the least loaded build agent, and write its
+    object file to obj.  Return the exit code of the compiler and its output, or None if
+    no agent could compile it, so it should be compiled here.
+    """
+    agent = _least_loaded()
+    if agent is None:
+        logging.info("No build agent is free; compiling %s here.", src.name)
+        return None
+    options = [o for o in cl_clo[1:] if not o.startswith(_PREPROCESSOR_OPTIONS)]
+    source = base64.b64encode(preprocessed.read_bytes()).decode()
+    request = {'compile': {'options': options,
+                           'name': src.stem + '.i',
+                           'language': '/Tc' if src.suffix == '.c' else '/Tp',
+                           'source': source}}
+    logging.info("Compiling %s on build agent %s.", src.name, agent)
+    try:
+        reply = _request(agent, request, settings().get('agent_compile_seconds', 600))
+    except (OSError, ValueError) as e:
+        _mark_down(agent, e)
+        return None
+    if reply['exit'] == 0:
+        obj.write_bytes(base64.b64decode(reply['obj']))
+    return reply['exit'], reply['output']
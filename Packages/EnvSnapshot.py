@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import logging
+import importlib
+import subprocess
+from pathlib import Path
+import Packages.Timing as Timing
+from Packages.FileLock import staging_path
+from Packages.Settings import cache_dir
+
+# The version of the snapshot format.  Snapshots of other versions are rebuilt.
+_VERSION = 1
+
+# A background rebuild which has not finished in this time is presumed dead:
+_REBUILD_TIMEOUT_SECONDS = 600
+
+
+def _snapshot_path(name : str) -> Path:
+    return cache_dir('env') / f'{name}.json'
+
+
+def _read(name : str) -> dict | None:
+    try:
+        with open(_snapshot_path(name)) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get('version') != _VERSION:
+        return None
+    return snapshot
+
+
+def _write(name : str, snapshot : dict):
+    """
+    Write the snapshot atomically, so concurrent invocations never read half of it.
+    """
+    path = _snapshot_path(name)
+    tmp_path = staging_path(path)
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+@Timing.timed('rebuild env snapshot')
+def rebuild(module_name : str) -> dict:
+    """
+    Create anew the snapshot of the environment of the given module, and save it.  The
+    module provides SNAPSHOT_NAME, create_snapshot() and fingerprint().
+    """
+    module = importlib.import_module(module_name)
+    snapshot = module.create_snapshot()
+    snapshot['version'] = _VERSION
+    snapshot['fingerprint'] = module.fingerprint(snapshot['vars'])
+    _write(module.SNAPSHOT_NAME, snapshot)
+    logging.debug('Created env snapshot %s', _snapshot_path(module.SNAPSHOT_NAME))
+    return snapshot
+
+
+def _rebuild_in_background(module_name : str, name : str):
+    """
+    Rebuild the snapshot in a detached process, unless one is already at it.
+    """
+    marker = _snapshot_path(name).with_suffix('.rebuilding')
+    if marker.exists() and \
+       time.time() - marker.stat().st_mtime < _REBUILD_TIMEOUT_SECONDS:
+        return
+    marker.touch()
+    options = dict()
+    if os.name == 'nt':
+        options['creationflags'] = subprocess.DETACHED_PROCESS | \
+            subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        options['start_new_session'] = True
+    package_dir = Path(os.path.realpath(__file__)).parent
+    subprocess.Popen([sys.executable, "-m", "Packages.EnvSnapshot", module_name],
+                     cwd=str(package_dir.parent), stdin=subprocess.DEVNULL,
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **options)
+    logging.debug('Rebuilding env snapshot %s in the background.', name)
+
+
+def _is_usable(snapshot : dict) -> bool:
+    """
+    Is a stale snapshot still good enough for this invocation?  Not if any of its PATH
+    directories were removed, as by an update which removes the old compiler.
+    """
+    return all(Path(d).exists() for d in snapshot['path'])
+
+
+def load(module_name : str) -> dict:
+    """
+    The snapshot of the environment of the given module.  The fingerprint of the
+    installation is checked against that of the snapshot.  If they differ, a stale
+    snapshot which is still usable is returned while it is rebuilt in the background;
+    otherwise the snapshot is rebuilt now.
+    """
+    module = importlib.import_module(module_name)
+    name = module.SNAPSHOT_NAME
+    snapshot = _read(name)
+    if snapshot is None:
+        return rebuild(module_name)
+    if module.fingerprint(snapshot['vars']) == snapshot['fingerprint']:
+        logging.debug('Loaded env snapshot %s', _snapshot_path(name))
+        return snapshot
+    logging.debug('The installation has changed since env snapshot %s.', name)
+    if _is_usable(snapshot):
+        _rebuild_in_background(module_name, name)
+        return snapshot
+    return rebuild(module_name)
+
+
+def apply(snapshots : list[dict]):
+    """
+    Set the variables of the snapshots which are not already set, and prepend their PATH
+    directories which are not already on PATH.  PATH is merged once for them all.
+    """
+    path = os.environ.get('PATH', '').split(os.pathsep)
+    on_path = set(path)
+    new_dirs = list()
+    for snapshot in snapshots:
+        for n, v in snapshot['vars'].items():
+            if n not in os.environ:
+                os.environ[n] = v
+        for d in snapshot['path']:
+            if d not in on_path:
+                on_path.add(d)
+                new_dirs.append(d)
+    os.environ['PATH'] = os.pathsep.join(new_dirs + path)
+
+
+@Timing.timed('setup_env packages')
+def setup(module_names : list[str]):
+    """
+    Load the snapshot of the environment of each of the given modules and apply them.
+    """
+    apply([load(module_name) for module_name in module_names])
+    logging.debug('PATH == %s', os.environ['PATH'])
+
+
+def parse_set_output(output : bytes, env : dict) -> dict:
+    """
+    Parse the output of cmd.exe's set command into a snapshot: the variables which are
+    not already in env, and the PATH directories which are not already on PATH.
+    """
+    snapshot = {'vars': dict(), 'path': list()}
+    on_path = set(env.get('PATH', '').split(';'))
+    e = output.replace(b'\r\n', b'\n').decode('latin1')
+    for l in e.split('\n'):
+        s = l.split('=')
+        if len(s) == 2:
+            n, v = s
+            if n == 'PATH':
+                for d in v.split(';'):
+                    d = d.replace('\\\\', '\\')
+                    if d and d not in on_path:
+                        on_path.add(d)
+                        snapshot['path'].append(d)
+            elif not env.get(n):
+                snapshot['vars'][n] = v
+    return snapshot
+
+
+def fingerprint_paths(paths : list[Path]) -> str:
+    """
+    A cheap fingerprint of the given files and directories: their sizes and mtimes, and
+    the names in each directory.
+    """
+    parts = list()
+    for p in paths:
+        try:
+            st = p.stat()
+        except OSError:
+            parts.append(f'{p}:missing')
+            continue
+        parts.append(f'{p}:{st.st_size}:{st.st_mtime_ns}')
+        if p.is_dir():
+            parts.append(','.join(sorted(os.listdir(p))))
+    return '|'.join(parts)
+
+
+if __name__ == '__main__':
+    try:
+        rebuild(sys.argv[1])
+    finally:
+        name = importlib.import_module(sys.argv[1]).SNAPSHOT_NAME
+        _snapshot_path(name).with_suffix('.rebuilding').unlink(missing_ok=True)
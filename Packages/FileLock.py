@@ -0,0 +1,86 @@
+import os
+import time
+import hashlib
+import threading
+from pathlib import Path
+from Packages.Settings import cache_dir
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+def staging_path(path : Path) -> Path:
+    """
+    A path beside the given one, unique to this process and thread, at which to write a
+    file before renaming it over the path, so readers never see it half written.  It keeps
+    the suffix of the path, so tools which go by the suffix take it for the same kind.
+    """
+    return path.with_name(f'{path.stem}.{os.getpid()}-{threading.get_ident()}.tmp'
+                          f'{path.suffix}')
+
+
+class FileLock:
+    """
+    An exclusive lock of a path, such as a target or a deployed DLL, held with 'with'
+    across processes and threads.  The lock files are kept in the locks directory of the
+    cache, rather than beside the paths, and removed on release, unless another process
+    has one open on Windows, since each temp target of Org mode has a lock of its own.
+    """
+
+    def __init__(self, path : Path | str):
+        name = os.path.normcase(os.path.abspath(path))
+        digest = hashlib.sha256(name.encode('utf-8')).hexdigest()
+        self._lock_path = cache_dir('locks') / (digest + '.lock')
+        self._file = None
+
+    def __enter__(self):
+        while True:
+            self._file = open(self._lock_path, 'a+b')
+            try:
+                if os.name == 'nt':
+                    while True:
+                        self._file.seek(0)
+                        try:
+                            # Retries for 10 seconds, and then raises OSError:
+                            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            time.sleep(0.01)
+                    return self
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+                if self._is_current():
+                    return self
+            except BaseException:
+                self._file.close()
+                raise
+            # The holder removed the file as it released the lock, so lock the new one:
+            self._file.close()
+
+    def _is_current(self) -> bool:
+        """
+        Is the locked file still the one at the lock path?
+        """
+        try:
+            st = os.stat(self._lock_path)
+        except FileNotFoundError:
+            return False
+        locked_st = os.fstat(self._file.fileno())
+        return (st.st_dev, st.st_ino) == (locked_st.st_dev, locked_st.st_ino)
+
+    def __exit__(self, *exc_info):
+        if os.name == 'nt':
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            try:
+                self._lock_path.unlink()
+            except OSError:
+                pass  # Open in another process, which removes it in turn.
+        else:
+            # Removed while still locked, so whoever locks it next sees it is gone:
+            self._lock_path.unlink(missing_ok=True)
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+        self._file = None
@@ -0,0 +1,197 @@
+import os
+import re
+import json
+import shutil
+import logging
+from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import Packages.Backends as Backends
+import Packages.Depends as Depends
+import Packages.Diagnostics as Diagnostics
+import Packages.Timing as Timing
+from Packages.Cache import LRUCache, hash_strings
+from Packages.Settings import settings
+
+_angle_include_regex = re.compile(r'\s*#\s*include\s*<([^>]+)>\s*$')
+_quote_include_regex = re.compile(r'\s*#\s*include\s*"[^"]+"\s*$')
+
+# The headers of the standard library whose macros a block may use, which import std does
+# not export, so they are imported as header units even with import std:
+_MACRO_HEADERS = {'cassert', 'cerrno', 'cfloat', 'climits', 'csetjmp', 'csignal',
+                  'cstdarg', 'cstdio', 'cstdlib', 'cwchar', 'version'}
+
+
+@lru_cache
+def _cache() -> LRUCache:
+    return LRUCache('ifc', settings().get('ifc_cache_mb', 4096))
+
+
+def is_enabled(tool_flags : frozenset[str]) -> bool:
+    """
+    Should the headers at the top of each source be imported as header units?  A block
+    opts in with -header-units, or out with -no-header-units, whatever the header_units
+    setting.
+    """
+    if '-no-header-units' in tool_flags:
+        return False
+    return '-header-units' in tool_flags or settings().get('header_units', False)
+
+
+def _is_standard(header : str) -> bool:
+    """
+    Is the header one of the standard library, such as vector or cstdio?
+    """
+    return '.' not in header and '/' not in header
+
+
+def _usable_entry(key : str) -> Path | None:
+    """
+    The entry of the given key, unless there is none or any of the headers it was built
+    from has changed since.  An entry of a header which failed to build is usable too.
+    """
+    entry_dir = _cache().get(key)
+    if entry_dir is None:
+        return None
+    if not Depends.is_up_to_date(_cache().meta(key).get('headers', [])):
+        logging.debug("Header unit %s is out of date.", key)
+        return None
+    return entry_dir
+
+
+def _std_module_source() -> Path | None:
+    """
+    The std.ixx of the installed MSVC, from which import std is built, if it has one.
+    """
+    tools_dir = os.environ.get('VCToolsInstallDir')
+    if tools_dir is None:
+        return None
+    std_ixx = Path(tools_dir) / 'modules' / 'std.ixx'
+    return std_ixx if std_ixx.exists() else None
+
+
+def _build(name : str, cl_clo : list[str], staging_dir : Path) -> Diagnostics.ToolOutput:
+    """
+    Build the ifc and the object file of a header unit, or of the std module if the name
+    is std.ixx, in the staging directory.
+    """
+    if name.endswith('.ixx'):
+        unit_options = ["/interface", name]
+    else:
+        unit_options = ["/exportHeader", "/headerName:angle", name]
+    clo = cl_clo + ["/c", "/sourceDependencies", str(staging_dir / 'deps.json'),
+                    "/ifcOutput", str(staging_dir / 'unit.ifc'),
+                    "/Fo" + str(staging_dir / 'unit.obj')] + unit_options
+    logging.debug("header unit clo == %s", clo)
+    with Timing.span('build header unit', header=name):
+        return Diagnostics.run_tool(clo, cwd=str(staging_dir), echo=False)
+
+
+def _dependencies(staging_dir : Path) -> list[Path]:
+    """
+    The header or module source which was built and the headers it included, from the
+    /sourceDependencies output of cl.exe.
+    """
+    with open(staging_dir / 'deps.json', encoding='utf-8') as f:
+        data = json.load(f)['Data']
+    return [Path(p) for p in [data['Source']] + data.get('Includes', [])]
+
+
+def _units(names : list[str], cl_clo : list[str]) -> dict[str, Path | None]:
+    """
+    The cache entry of each header unit, building those which are not cached at once, or
+    None for those which cannot be header units, or whose out-of-date entry is in use.
+    """
+    identity = Backends.current().toolchain_identity()
+    keys = {name: hash_strings([name] + cl_clo + [identity]) for name in names}
+    entries = {name: _usable_entry(key) for name, key in keys.items()}
+    missing = [name for name, entry in entries.items() if entry is None]
+    if missing:
+        staging_dirs = {name: _cache().stage(keys[name]) for name in missing}
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            outputs = dict(zip(missing, executor.map(
+                lambda name: _build(name, cl_clo, staging_dirs[name]), missing)))
+        for name in missing:
+            if outputs[name].returncode != 0:
+                # Remember that it failed, so it is not tried again by every block:
+                logging.info("%s cannot be a header unit:\n%s", name, outputs[name].text)
+                shutil.rmtree(staging_dirs[name], ignore_errors=True)
+                _cache().put(keys[name], {}, {'name': name, 'failed': True},
+                             replace=True)
+            else:
+                headers = Depends.record(_dependencies(staging_dirs[name]))
+                _cache().commit(keys[name], staging_dirs[name],
+                                {'name': name, 'headers': headers}, replace=True)
+        for name in missing:
+            # An out-of-date entry which is open on Windows was not replaced:
+            meta = _cache().meta(keys[name])
+            if Depends.is_up_to_date(meta.get('headers', [])):
+                entries[name] = _cache().dir / keys[name]
+    return {name: None if entry is None or _cache().meta(entry.name).get('failed')
+            else entry for name, entry in entries.items()}
+
+
+def prepare(src : Path, cl_clo : list[str]) -> tuple[list[str], list[Path], list[Path],
+                                                     str] | None:
+    """
+    Import the headers in angle brackets at the top of the source as header units, or
+    the standard library as the std module if the import_std setting is on, building
+    those which are not cached yet.  Return the compiler options which use the units,
+    their object files to link with, the headers they were built from, and the text of
+    the source with the #includes replaced by imports, line for line, or None if no header
+    could be imported.
+    """
+    lines = src.read_text(encoding='utf-8', errors='replace').splitlines(keepends=True)
+    includes = dict()  # The line of each #include in angle brackets at the top.
+    for n, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        m = _angle_include_regex.match(line)
+        if m:
+            includes[n] = m.group(1)
+        elif not _quote_include_regex.match(line):
+            break  # Not even an #include in quotes, which stays as it is.
+    if not includes:
+        return None
+    headers = list(includes.values())
+    use_std = settings().get('import_std', False) and \
+        _std_module_source() is not None and \
+        any(_is_standard(h) and h not in _MACRO_HEADERS for h in headers)
+    if use_std:
+        headers = [h for h in headers if not _is_standard(h) or h in _MACRO_HEADERS]
+        std_entry = _units([str(_std_module_source())], cl_clo)[str(_std_module_source())]
+        use_std = std_entry is not None
+    entries = _units(headers, cl_clo)
+
+    options = list()
+    objs = list()
+    dependencies = list()
+    if use_std:
+        options.append("/reference")
+        options.append("std=" + str(std_entry / 'unit.ifc'))
+        objs.append(std_entry / 'unit.obj')
+        dependencies += _cache().meta(std_entry.name)['headers']
+    for header, entry in entries.items():
+        if entry is not None:
+            options.append("/headerUnit:angle")
+            options.append(f"{header}={entry / 'unit.ifc'}")
+            objs.append(entry / 'unit.obj')
+            dependencies += _cache().meta(entry.name)['headers']
+    if not objs:
+        return None
+
+    std_line = None  # The line of the last header which import std replaces.
+    if use_std:
+        std_line = max(n for n, h in includes.items()
+                       if _is_standard(h) and h not in _MACRO_HEADERS)
+    for n, header in includes.items():
+        if n == std_line:
+            lines[n] = 'import std;\n'
+        elif use_std and _is_standard(header) and header not in _MACRO_HEADERS:
+            lines[n] = '\n'
+        elif entries.get(header) is not None:
+            lines[n] = f'import <{header}>;\n'
+    # With the name and line numbers of the source for the diagnostics:
+    text = f'#line 1 "{src.as_posix()}"\n' + ''.join(lines)
+    return options, objs, [Path(h[0]) for h in dependencies], text
@@ -0,0 +1,130 @@
+import shutil
+from abc import abstractmethod
+from pathlib import Path
+from Packages.Diagnostics import ToolOutput
+from Packages.IPackage import _InterfaceBase, _InterfaceMeta
+
+
+def identify_programs(programs : list[str]) -> str:
+    """
+    A string which identifies the installed programs by their paths, sizes and mtimes.  It
+    changes whenever one of them is updated.
+    """
+    identity = list()
+    for program in programs:
+        path = shutil.which(program) or program
+        identity.append(path)
+        if Path(path).exists():
+            st = Path(path).stat()
+            identity += [str(st.st_size), str(st.st_mtime_ns)]
+    return ';'.join(identity)
+
+
+class IBackend(_InterfaceBase, metaclass=_InterfaceMeta):
+    """
+    Interface to a toolchain which compiles and links the blocks: its compiler, its
+    linker, how it reports the headers a source includes, how it reads the libraries an
+    executable imports, and how the flags of a block are spelled for it.
+    """
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """
+        The name of the backend, as chosen by the backend setting.
+        """
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def compiler(self) -> str:
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def linker(self) -> str:
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def features(self) -> frozenset[str]:
+        """
+        What the backend supports of 'pch', 'header-units', 'distributed', 'run-cache' and
+        'time-report'.
+        """
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def common_options_file(self) -> str:
+        """
+        The json file beside Packages.Common with the common options for this backend.
+        """
+        raise NotImplementedError()
+
+    @property
+    @abstractmethod
+    def option_prefix(self) -> str:
+        """
+        The prefix of the options of the compiler, such as of /D and /I.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def translate_flag(self, flag : str) -> str:
+        """
+        A compiler flag of a block, as written in Org mode, spelled for the compiler.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def lib_dir_option(self, lib_dir : str) -> str:
+        """
+        The linker option which adds a directory to search for libs.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def setup_env(self):
+        """
+        Set up the environment variables which the toolchain needs.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def toolchain_identity(self) -> str:
+        """
+        A string which identifies the installed toolchain.  It changes whenever the
+        compiler is updated, so the caches keyed by it are not reused.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def compile_command(self, options : list[str], src : Path, obj : Path) -> list[str]:
+        """
+        The command line which compiles src into obj, and reports the headers src
+        includes.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def included_headers(self, output : ToolOutput, obj : Path) -> list[Path]:
+        """
+        The headers which the compilation of obj reported.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def link_command(self, options : list[str], objs : list[Path], libs : list[str],
+                     target : Path) -> list[str]:
+        """
+        The command line which links the object files and libs into target.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def imported_libraries(self, path : Path) -> list[str]:
+        """
+        The names of the shared libraries which the executable or shared library imports.
+        """
+        raise NotImplementedError()
@@ -1,19 +1,38 @@
-from pathlib import Path
-from abc import ABCMeta
-from abc import abstractmethod
-from overrides import EnforceOverrides
-import shutil
+import os
 import logging
 import Packages.DLLs
+import Packages.Deploy
+from abc import abstractmethod
 from pathlib import Path
 
+# Checking the interface at class creation costs startup time on every invocation, so it
+# is done only when INVOKE_MSVC_CHECK_INTERFACES is set, as when developing and testing:
+if os.environ.get('INVOKE_MSVC_CHECK_INTERFACES'):
+    from abc import ABCMeta as _InterfaceMeta
+    from overrides import EnforceOverrides as _InterfaceBase
+    from overrides import overrides
+else:
+    _InterfaceMeta = type
+    _InterfaceBase = object
+
+    def overrides(method):
+        return method
+
 
-class IPackage(EnforceOverrides, metaclass=ABCMeta):
+class IPackage(_InterfaceBase, metaclass=_InterfaceMeta):
     """
     Interface to a package of the compilation process.  The details of each package are
     listed on the command line to the compiler.
     """
 
+    @property
+    def env_snapshot(self) -> str | None:
+        """
+        The module whose environment snapshot this package needs, if any.  It is loaded
+        only when the package is used.  See Packages.EnvSnapshot.
+        """
+        return None
+
     @property
     @abstractmethod
     def should_use(self) -> bool:
@@ -99,29 +118,24 @@ class IPackage(EnforceOverrides, metaclass=ABCMeta):
         """
         Locate the canonical path to each required DLL.
         """
-        self._uncopied_dlls = set()
-        located_dlls = set()
-        for dll in Packages.DLLs.required_by_target(target):
-            dll_path = self.dll_dir / dll
-            logging.debug("dll_path == {}".format(dll_path))
-            if dll_path.exists():
-                located_dlls.add(dll_path)
-                recursed_required_dlls = self.locate_required_dlls(str(dll_path))
-                located_dlls |= recursed_required_dlls
-            else:
-                self._uncopied_dlls.add(dll)
-        return(located_dlls)
+        located, self._uncopied_dlls = Packages.DLLs.resolve_graph(target, [self])
+        return(located[self])
 
 
-    def duplicate_required_dlls(self, target : str):
+    def duplicate_required_dlls(self, target : str, dlls : set[str] = None) -> set[str]:
         """
-        Copy DLLs from their library location to beside the target executable.
+        Copy DLLs from their library location to beside the target executable, unless an
+        identical copy is already there.  Return the locations of the copied DLLs.  The
+        DLLs are located anew unless they were already located by
+        Packages.DLLs.resolve_graph().
         """
+        dlls_to_be_copied = set()
         if self.should_use:
-            dlls_to_be_copied = self.locate_required_dlls(target)
+            if dlls is None:
+                dlls = self.locate_required_dlls(target)
+                logging.debug("Uncopied DLLs: %s", self._uncopied_dlls)
+            dlls_to_be_copied = dlls
             dest_path = Path(target).parent # Copy DLL beside target executable.
-            logging.debug("Dest path of DLLs: {}".format(str(dest_path)))
-            for dll_path in dlls_to_be_copied:
-                shutil.copy2(dll_path, dest_path)
-                logging.debug("Copied required DLL: {}".format(str(dll_path)))
-            logging.debug("Uncopied DLLs: {}".format(self._uncopied_dlls))
+            logging.debug("Dest path of DLLs: %s", str(dest_path))
+            Packages.Deploy.deploy(dlls_to_be_copied, dest_path)
+        return dlls_to_be_copied
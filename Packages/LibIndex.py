@@ -0,0 +1,55 @@
+import logging
+from bisect import bisect_left
+from pathlib import Path
+from functools import lru_cache
+from Packages.Cache import JsonStore
+from Packages.Settings import cache_dir
+
+
+class _Store:
+    """
+    The persistent index of the lib stems in each lib dir, sorted, so the libs whose stems
+    start with a prefix are found by bisection, as soon as the index is read.  The index
+    of a dir is rebuilt only when the mtime of the dir changes, as it does when a lib is
+    added or removed.
+    """
+
+    def __init__(self):
+        self._store = JsonStore(cache_dir('libs') / 'index.json')
+
+    def libs(self, lib_dir : Path) -> tuple[list[str], list[str]]:
+        """
+        The sorted stems of the libs in lib_dir, and the paths of the libs in the same
+        order.
+        """
+        mtime_ns = lib_dir.stat().st_mtime_ns
+        entry = self._store.get(str(lib_dir))
+        if entry is not None and entry['mtime_ns'] == mtime_ns and 'stems' in entry:
+            return entry['stems'], entry['paths']
+        logging.debug("Indexing lib dir: %s", lib_dir)
+        libs = sorted((f.stem, str(f)) for f in lib_dir.glob('*.lib'))
+        stems = [stem for stem, _ in libs]
+        paths = [path for _, path in libs]
+        self._store.set(str(lib_dir), {'mtime_ns': mtime_ns, 'stems': stems,
+                                       'paths': paths})
+        self._store.save()
+        return stems, paths
+
+
+@lru_cache
+def _store() -> _Store:
+    return _Store()
+
+
+def libs_with_prefix(lib_dir : Path, prefix : str) -> list[str]:
+    """
+    The paths of the lib files in lib_dir whose stems start with prefix, in order of
+    their stems.
+    """
+    stems, paths = _store().libs(lib_dir)
+    found = list()
+    for i in range(bisect_left(stems, prefix), len(stems)):
+        if not stems[i].startswith(prefix):
+            break
+        found.append(paths[i])
+    return found
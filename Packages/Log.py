@@ -0,0 +1,78 @@
+import os
+import queue
+import atexit
+import logging
+import logging.handlers
+from pathlib import Path
+from Packages.Settings import cache_dir, settings
+
+# Environment variables which override the log_level and log_file settings:
+LEVEL_ENV_VAR = 'INVOKE_MSVC_LOG_LEVEL'
+FILE_ENV_VAR = 'INVOKE_MSVC_LOG_FILE'
+
+_listener = None      # The background writer of this process.
+_listener_pid = None  # A worker forked from a process with a writer needs its own.
+
+
+class _RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    A size-rotated log which many processes may share.  If another process holds the
+    log open, as Windows does not allow it to be renamed, it is rotated later.
+    """
+
+    def rotate(self, source, dest):
+        try:
+            super().rotate(source, dest)
+        except OSError:
+            pass
+
+
+def log_path() -> Path:
+    """
+    The log file: that of INVOKE_MSVC_LOG_FILE or the log_file setting, or else
+    invoke-msvc.log in the logs directory of the cache.
+    """
+    value = os.environ.get(FILE_ENV_VAR) or settings().get('log_file')
+    if value:
+        path = Path(value).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+    return cache_dir('logs') / 'invoke-msvc.log'
+
+
+def log_level() -> int:
+    """
+    The level of the log: that of INVOKE_MSVC_LOG_LEVEL or the log_level setting.
+    """
+    name = os.environ.get(LEVEL_ENV_VAR) or settings().get('log_level', 'INFO')
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        raise Exception(f'Unknown log level: {name}')
+    return level
+
+
+def setup():
+    """
+    Log to the log file through a queue, which a background thread writes to the file, so
+    logging never waits on the disk.  Messages below the level are dropped before they
+    are formatted.
+    """
+    global _listener, _listener_pid
+    if _listener is not None and _listener_pid == os.getpid():
+        return
+    max_bytes = settings().get('log_max_mb', 10) * 1024 * 1024
+    handler = _RotatingFileHandler(log_path(), encoding='utf-8', delay=True,
+                                   maxBytes=max_bytes,
+                                   backupCount=settings().get('log_backups', 3))
+    handler.setFormatter(logging.Formatter(
+        '%(asctime)s\t%(levelname)s\t%(process)d\t%(message)s'))
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(log_level())
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener_pid = os.getpid()
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,111 @@
+from pathlib import Path
+import Packages.MSVC2022 as MSVC2022
+import Packages.PE
+from Packages.Diagnostics import ToolOutput
+from Packages.IBackend import IBackend, identify_programs
+from Packages.IPackage import overrides
+from Packages.Settings import settings
+
+
+class MSVC(IBackend):
+    """
+    cl.exe and link.exe of MSVC 2022.
+    """
+
+    @property
+    @overrides
+    def name(self) -> str:
+        return 'msvc'
+
+    @property
+    @overrides
+    def compiler(self) -> str:
+        return 'cl.exe'
+
+    @property
+    @overrides
+    def linker(self) -> str:
+        return 'link.exe'
+
+    @property
+    @overrides
+    def features(self) -> frozenset[str]:
+        return frozenset({'pch', 'header-units', 'distributed', 'run-cache',
+                          'time-report'})
+
+    @property
+    @overrides
+    def common_options_file(self) -> str:
+        return 'common.json'
+
+    @property
+    @overrides
+    def option_prefix(self) -> str:
+        return '/'
+
+    @overrides
+    def translate_flag(self, flag : str) -> str:
+        return flag.replace("-", "/") if flag.startswith("-") else flag
+
+    @overrides
+    def lib_dir_option(self, lib_dir : str) -> str:
+        return "/LIBPATH:" + lib_dir
+
+    @overrides
+    def setup_env(self):
+        MSVC2022.setup_env()
+
+    @overrides
+    def toolchain_identity(self) -> str:
+        return MSVC2022.toolchain_identity()
+
+    @overrides
+    def compile_command(self, options : list[str], src : Path, obj : Path) -> list[str]:
+        return [self.compiler] + options + ["/c", "/showIncludes", "/Fo" + str(obj),
+                                            str(src)]
+
+    @overrides
+    def included_headers(self, output : ToolOutput, obj : Path) -> list[Path]:
+        return output.headers
+
+    @overrides
+    def link_command(self, options : list[str], objs : list[Path], libs : list[str],
+                     target : Path) -> list[str]:
+        return [self.linker, "/out:" + str(target)] + options + \
+            [str(o) for o in objs] + libs
+
+    @overrides
+    def imported_libraries(self, path : Path) -> list[str]:
+        return Packages.PE.imported_dlls(path)
+
+
+class ClangCL(MSVC):
+    """
+    clang-cl and lld-link, which take the options of cl.exe and link.exe, with the headers
+    and libs of MSVC 2022.  lld-link links much faster than link.exe.
+    """
+
+    @property
+    @overrides
+    def name(self) -> str:
+        return 'clang-cl'
+
+    @property
+    @overrides
+    def compiler(self) -> str:
+        return settings().get('clang_cl', 'clang-cl.exe')
+
+    @property
+    @overrides
+    def linker(self) -> str:
+        return settings().get('lld_link', 'lld-link.exe')
+
+    @property
+    @overrides
+    def features(self) -> frozenset[str]:
+        return frozenset({'pch', 'run-cache'})
+
+    @overrides
+    def toolchain_identity(self) -> str:
+        return ';'.join([MSVC2022.toolchain_identity(),
+                         identify_programs([self.compiler, self.linker])])
@@ -0,0 +1,103 @@
+import os
+import re
+import subprocess
+from pathlib import Path
+from Packages.Diagnostics import ToolOutput
+from Packages.IBackend import IBackend, identify_programs
+from Packages.IPackage import overrides
+from Packages.Settings import settings
+
+_needed_regex = re.compile(r'\(NEEDED\).*\[(.+)\]')
+
+
+def parse_depfile(text : str) -> list[Path]:
+    """
+    The prerequisites of the make rule which gcc and clang write for -MD, except the
+    source itself, which comes first.
+    """
+    rule = text.replace('\\\n', ' ')
+    _, _, prerequisites = rule.partition(': ')
+    paths = [p.replace('\\ ', ' ') for p in re.split(r'(?<!\\)\s+', prerequisites) if p]
+    return [Path(p).resolve() for p in paths[1:]]
+
+
+class Native(IBackend):
+    """
+    The native clang or gcc of Linux, and readelf in the place of dumpbin, so the whole
+    pipeline, caches included, runs on Linux.  The compiler is that of the CXX
+    environment variable or the native_compiler setting.
+    """
+
+    @property
+    @overrides
+    def name(self) -> str:
+        return 'native'
+
+    @property
+    @overrides
+    def compiler(self) -> str:
+        return os.environ.get('CXX') or settings().get('native_compiler', 'c++')
+
+    @property
+    @overrides
+    def linker(self) -> str:
+        return self.compiler
+
+    @property
+    @overrides
+    def features(self) -> frozenset[str]:
+        return frozenset()
+
+    @property
+    @overrides
+    def common_options_file(self) -> str:
+        return 'common-native.json'
+
+    @property
+    @overrides
+    def option_prefix(self) -> str:
+        return '-'
+
+    @overrides
+    def translate_flag(self, flag : str) -> str:
+        return flag
+
+    @overrides
+    def lib_dir_option(self, lib_dir : str) -> str:
+        return "-L" + lib_dir
+
+    @overrides
+    def setup_env(self):
+        pass
+
+    @overrides
+    def toolchain_identity(self) -> str:
+        return identify_programs([self.compiler])
+
+    @overrides
+    def compile_command(self, options : list[str], src : Path, obj : Path) -> list[str]:
+        depfile = obj.with_suffix('.d')
+        return [self.compiler] + options + ["-c", "-MD", "-MF", str(depfile),
+                                            "-o", str(obj), str(src)]
+
+    @overrides
+    def included_headers(self, output : ToolOutput, obj : Path) -> list[Path]:
+        depfile = obj.with_suffix('.d')
+        if not depfile.exists():
+            return list()
+        headers = parse_depfile(depfile.read_text(errors='replace'))
+        depfile.unlink()
+        return headers
+
+    @overrides
+    def link_command(self, options : list[str], objs : list[Path], libs : list[str],
+                     target : Path) -> list[str]:
+        return [self.linker, "-o", str(target)] + [str(o) for o in objs] + libs + options
+
+    @overrides
+    def imported_libraries(self, path : Path) -> list[str]:
+        cp = subprocess.run([settings().get('readelf', 'readelf'), '-d', str(path)],
+                            capture_output=True, text=True)
+        if cp.returncode != 0:
+            raise Exception(f"readelf failed on {path}: {cp.stderr}")
+        return _needed_regex.findall(cp.stdout)
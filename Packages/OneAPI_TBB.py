@@ -1,14 +1,24 @@
 import os
 import re
 import json
-import logging
 import subprocess
-from dotenv import load_dotenv
-from overrides import overrides
+import Packages.EnvSnapshot as EnvSnapshot
 from pathlib import Path
-from Packages.IPackage import IPackage
+from Packages.IPackage import IPackage, overrides
+from Packages.LibIndex import libs_with_prefix
 
-def _create_env(env_path):
+SNAPSHOT_NAME = 'oneapi-tbb'
+
+
+def fingerprint(env_vars : dict) -> str:
+    """
+    A cheap fingerprint of the installation of TBB: its root directory and vars.bat.
+    """
+    TBB_ROOT = Path(os.environ['TBB_ROOT'])
+    return EnvSnapshot.fingerprint_paths([TBB_ROOT, TBB_ROOT / "env" / "vars.bat"])
+
+
+def create_snapshot() -> dict:
     """
     Create the environment variables to suit Intel's oneAPI.
     Depends on the TBB_ROOT environment variable.
@@ -17,65 +27,26 @@ def _create_env(env_path):
     if not TBB_ROOT.exists():
         raise Exception("No such directory: TBB Root")
 
-    with open(env_path, 'w') as fenv:
-        TBBVARS = TBB_ROOT / "env" /  "vars.bat"
-        if not TBBVARS.exists():
-            raise Exception("No such file: env/vars.bat")
-        os.environ['TBBVARS'] = str(TBBVARS)
-        fenv.write(f"TBBVARS={os.environ['TBBVARS']}\n")
-        p = subprocess.run([
-            "cmd.exe",
-            "/c",
-            "CALL",
-            str(TBBVARS),
-            "intel64",
-            "vs2022",
-            ">nul",
-            "2>&1",
-            "&&",
-            "set"
-        ], capture_output=True)
-        if p.returncode != 0:
-            raise Exception('cmd failed: ' + str(p))
-        m = str(os.getenv("PATH")).split(';')
-        z = list()
-        e = p.stdout.replace(b'\r\n', b'\n').decode('latin1')
-
-        for l in e.split('\n'):
-            s = l.split('=')
-            if len(s) == 2:
-                n, v = s
-                if not os.getenv(n):
-                    os.environ[n] = v
-                    fenv.write(f"{n}={v}\n")
-                    if n == 'PATH':
-                        for d in v.split(';'):
-                            d = d.replace('\\\\', '\\')
-                            if not d in m:
-                                m.append(d)
-                                z.append(d)
-        os.environ['PATH'] = ';'.join(z) + ';' + os.environ['PATH']
-        fenv.write(f"ZPATH={';'.join(z)}\n")
-
-
-def _setup_env():
-    """
-    Setup the environment variables for Intel's TBB.  Either: (1) read the
-    environment variable values from the cache file ~/.env, or (2) create anew the
-    environment variables, then cache them in env_path.
-    """
-    env_path = Path.home() / '.env-oneapi-tbb'
-    if env_path.exists():
-        p = os.environ['PATH']
-        load_dotenv(env_path)
-        if 'ZPATH' in os.environ.keys():
-            os.environ['PATH'] = os.environ['ZPATH'] + ';' + p
-        logging.debug(f'Loaded env from {env_path}')
-        logging.debug('PATH == {}'.format(os.environ['PATH']))
-    else:
-        _create_env(env_path)
-        logging.debug(f'Created env in {env_path}')
-        logging.debug('PATH == {}'.format(os.environ['PATH']))
+    TBBVARS = TBB_ROOT / "env" /  "vars.bat"
+    if not TBBVARS.exists():
+        raise Exception("No such file: env/vars.bat")
+    p = subprocess.run([
+        "cmd.exe",
+        "/c",
+        "CALL",
+        str(TBBVARS),
+        "intel64",
+        "vs2022",
+        ">nul",
+        "2>&1",
+        "&&",
+        "set"
+    ], capture_output=True)
+    if p.returncode != 0:
+        raise Exception('cmd failed: ' + str(p))
+    snapshot = EnvSnapshot.parse_set_output(p.stdout, os.environ)
+    snapshot['vars']['TBBVARS'] = str(TBBVARS)
+    return snapshot
 
 
 class TBB(IPackage):
@@ -85,7 +56,6 @@ class TBB(IPackage):
     """
 
     def __init__(self, argv : list[str] = []):
-        _setup_env()
         self._root = Path(os.environ['TBB_ROOT'])
         if not self._root.exists():
             raise Exception(f"No oneAPI TBB root: {self._root}")
@@ -124,19 +94,19 @@ class TBB(IPackage):
                 remainder_argv.append(arg)
         self._argv = remainder_argv  # Keep the args not used in this package.
 
-        # Find the TBB release lib files:
+        # Find the TBB release and debug lib files in the index of each lib dir:
         self._release_libs = list()
-        lib_glob = list(self.lib_dir.glob('*.lib')) # All libs in the lib dir.
-        for requested_lib in requested_libs:
-            found_libs = [str(n) for n in lib_glob if n.stem.startswith(requested_lib)]
-            self._release_libs.extend(found_libs)
-
-        # Find the TBB debug lib files:
         self._debug_libs = list()
-        lib_glob = list(self.debug_lib_dir.glob('*_debug.lib')) # All debug libs in the lib dir.
         for requested_lib in requested_libs:
-            found_libs = [str(n) for n in lib_glob if n.stem.startswith(requested_lib)]
-            self._debug_libs.extend(found_libs)
+            self._release_libs.extend(libs_with_prefix(self.lib_dir, requested_lib))
+            found_libs = libs_with_prefix(self.debug_lib_dir, requested_lib)
+            self._debug_libs.extend(n for n in found_libs
+                                    if Path(n).stem.endswith('_debug'))
+
+    @property
+    @overrides
+    def env_snapshot(self) -> str | None:
+        return __name__
 
     @property
     @overrides
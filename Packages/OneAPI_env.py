@@ -1,11 +1,21 @@
 import os
-import logging
 import subprocess
-from dotenv import load_dotenv
 from pathlib import Path
+import Packages.EnvSnapshot as EnvSnapshot
+import Packages.Timing as Timing
 
+SNAPSHOT_NAME = 'oneapi'
 
-def _create_env(env_path):
+
+def fingerprint(env_vars : dict) -> str:
+    """
+    A cheap fingerprint of the installation of oneAPI: its root directory and setvars.bat.
+    """
+    ONEAPI_ROOT = Path(os.environ['ONEAPI_ROOT'])
+    return EnvSnapshot.fingerprint_paths([ONEAPI_ROOT, ONEAPI_ROOT / "setvars.bat"])
+
+
+def create_snapshot() -> dict:
     """
     Create the environment variables to suit Intel's oneAPI.
     Depends on the ONEAPI_ROOT environment variable.
@@ -14,62 +24,32 @@ def _create_env(env_path):
     if not ONEAPI_ROOT.exists():
         raise Exception("No such directory: oneAPI Root")
 
-    with open(env_path, 'w') as fenv:
-        SETVARS = ONEAPI_ROOT / "setvars.bat"
-        if not SETVARS.exists():
-            raise Exception("No such file: setvars.bat")
-        os.environ['SETVARS'] = str(SETVARS)
-        fenv.write(f"SETVARS={os.environ['SETVARS']}\n")
-        p = subprocess.run([
-            "cmd.exe",
-            "/c",
-            "CALL",
-            str(SETVARS),
-            "intel64",
-            "vs2022",
-            ">nul",
-            "2>&1",
-            "&&",
-            "set"
-        ], capture_output=True)
-        if p.returncode != 0:
-            raise Exception('cmd failed: ' + str(p))
-        m = os.getenv("PATH").split(';')
-        z = list()
-        e = p.stdout.replace(b'\r\n', b'\n').decode('latin1')
-
-        for l in e.split('\n'):
-            s = l.split('=')
-            if len(s) == 2:
-                n, v = s
-                if not os.getenv(n):
-                    os.environ[n] = v
-                    fenv.write(f"{n}={v}\n")
-                    if n == 'PATH':
-                        for d in v.split(';'):
-                            d = d.replace('\\\\', '\\')
-                            if not d in m:
-                                m.append(d)
-                                z.append(d)
-        os.environ['PATH'] = ';'.join(z) + ';' + os.environ['PATH']
-        fenv.write(f"ZPATH={';'.join(z)}\n")
+    SETVARS = ONEAPI_ROOT / "setvars.bat"
+    if not SETVARS.exists():
+        raise Exception("No such file: setvars.bat")
+    p = subprocess.run([
+        "cmd.exe",
+        "/c",
+        "CALL",
+        str(SETVARS),
+        "intel64",
+        "vs2022",
+        ">nul",
+        "2>&1",
+        "&&",
+        "set"
+    ], capture_output=True)
+    if p.returncode != 0:
+        raise Exception('cmd failed: ' + str(p))
+    snapshot = EnvSnapshot.parse_set_output(p.stdout, os.environ)
+    snapshot['vars']['SETVARS'] = str(SETVARS)
+    return snapshot
 
 
+@Timing.timed('setup_env oneapi')
 def setup_env():
     """
-    Setup the environment variables for Intel's oneAPI.  Either: (1) read the
-    environment variable values from the cache file ~/.env, or (2) create anew the
-    environment variables, then cache them in ~/.env.
+    Setup the environment variables for Intel's oneAPI from a snapshot, which is created
+    anew only when the installation of oneAPI changes.
     """
-    env_path = Path.home() / '.env-oneapi'
-    if env_path.exists():
-        p = os.environ['PATH']
-        load_dotenv(env_path)
-        if 'ZPATH' in os.environ.keys():
-            os.environ['PATH'] = os.environ['ZPATH'] + ';' + p
-        logging.debug(f'Loaded env from {env_path}')
-        logging.debug('PATH == {}'.format(os.environ['PATH']))
-    else:
-        _create_env(env_path)
-        logging.debug(f'Created env in {env_path}')
-        logging.debug('PATH == {}'.format(os.environ['PATH']))
+    EnvSnapshot.setup([__name__])
@@ -0,0 +1,105 @@
+import re
+import shutil
+import logging
+from pathlib import Path
+from functools import lru_cache
+import Packages.Backends as Backends
+import Packages.Depends as Depends
+import Packages.Diagnostics as Diagnostics
+import Packages.Timing as Timing
+from Packages.Cache import LRUCache, hash_strings
+from Packages.Settings import settings
+
+_HEADER = 'pch.h'
+_include_regex = re.compile(r'\s*#\s*include\s*[<"][^>"]+[>"]\s*$')
+
+
+@lru_cache
+def _cache() -> LRUCache:
+    return LRUCache('pch', settings().get('pch_cache_mb', 4096))
+
+
+def is_enabled() -> bool:
+    """
+    Should the headers at the top of each source be precompiled?  Only if the
+    precompiled_headers setting says so, since the source is then compiled with /FI and
+    /Yu, which may change the meaning of the code before or among its includes.
+    """
+    return settings().get('precompiled_headers', False)
+
+
+def include_prefix(src : Path) -> list[str]:
+    """
+    The #include lines at the top of the source, before any other code.  Org mode writes
+    the :includes header of a block there, so the prefix is the same for every block
+    with the same :includes.  Blank lines and // comments are skipped.
+    """
+    prefix = list()
+    with open(src, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('//'):
+                continue
+            if not _include_regex.match(line):
+                break
+            prefix.append(stripped)
+    return prefix
+
+
+def _is_usable(key : str) -> Path | None:
+    """
+    The entry of the precompiled header of the given key, unless there is none or any of
+    the headers it was precompiled from has changed since.
+    """
+    entry_dir = _cache().get(key)
+    if entry_dir is None:
+        return None
+    if not Depends.is_up_to_date(_cache().meta(key).get('headers', [])):
+        logging.debug("Precompiled header %s is out of date.", key)
+        return None
+    return entry_dir
+
+
+def prepare(src : Path, cl_clo : list[str]) -> tuple[list[str], Path, list[Path]] | None:
+    """
+    Precompile the include prefix of the source with the given compiler command line, or
+    reuse the precompiled header of an earlier block with the same prefix and command
+    line.  Return the compiler options which use the precompiled header, the object file
+    to link with and the headers it was precompiled from, or None if there is no prefix,
+    it failed to precompile, or an out-of-date entry is in use and was not replaced.
+    """
+    prefix = include_prefix(src)
+    if not prefix:
+        return None
+    key = hash_strings(prefix + cl_clo + [Backends.current().toolchain_identity()])
+    logging.debug("pch key == %s for %s", key, prefix)
+    entry_dir = _is_usable(key)
+    if entry_dir is None:
+        staging_dir = _cache().stage(key)
+        (staging_dir / _HEADER).write_text('\n'.join(prefix) + '\n', encoding='utf-8')
+        (staging_dir / 'pch.cpp').write_text(f'#include "{_HEADER}"\n', encoding='utf-8')
+        pch_clo = cl_clo + ["/c", "/showIncludes", "/Yc" + _HEADER,
+                            "/Fp" + str(staging_dir / 'pch.pch'),
+                            "/Fo" + str(staging_dir / 'pch.obj'),
+                            str(staging_dir / 'pch.cpp')]
+        logging.debug("pch_clo == %s", pch_clo)
+        with Timing.span('precompile headers', prefix=prefix):
+            cp = Diagnostics.run_tool(pch_clo, cwd=str(staging_dir), echo=False)
+        if cp.returncode != 0:
+            logging.debug("Precompiling headers failed:\n%s", cp.text)
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return None
+        # The staging directory is renamed, so pch.h itself is not a dependency:
+        headers = [h for h in cp.headers if staging_dir.resolve() not in h.parents]
+        meta = {'prefix': prefix, 'headers': Depends.record(headers)}
+        entry_dir = _cache().commit(key, staging_dir, meta, replace=True)
+        if not Depends.is_up_to_date(_cache().meta(key).get('headers', [])):
+            # The out-of-date entry is open on Windows, so it was not replaced:
+            logging.debug("Precompiled header %s is in use and out of date.", key)
+            return None
+    headers = [Path(h[0]) for h in _cache().meta(key)['headers']]
+    options = ["/I" + str(entry_dir),
+               "/FI" + _HEADER,
+               "/Yu" + _HEADER,
+               "/Fp" + str(entry_dir / 'pch.pch')]
+    return options, entry_dir / 'pch.obj', headers
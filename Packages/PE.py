@@ -0,0 +1,141 @@
+import mmap
+import struct
+from pathlib import Path
+
+_IMPORT_DIRECTORY = 1
+_DELAY_IMPORT_DIRECTORY = 13
+_PE32_MAGIC = 0x10b
+_PE32_PLUS_MAGIC = 0x20b
+
+
+class _Image:
+    """
+    A read-only view of a PE/COFF image file, which maps RVAs to file offsets.
+    """
+
+    def __init__(self, data, path : Path):
+        self._data = data
+        self._path = path
+        if data[:2] != b'MZ':
+            raise Exception(f"Not a PE file (no MZ header): {path}")
+        pe_offset = self.u32(0x3c)
+        if data[pe_offset:pe_offset + 4] != b'PE\0\0':
+            raise Exception(f"Not a PE file (no PE signature): {path}")
+        coff = pe_offset + 4
+        number_of_sections = self.u16(coff + 2)
+        size_of_optional_header = self.u16(coff + 16)
+        optional = coff + 20
+        magic = self.u16(optional)
+        if magic == _PE32_MAGIC:
+            self.image_base = self.u32(optional + 28)
+            rva_count_offset = optional + 92
+        elif magic == _PE32_PLUS_MAGIC:
+            self.image_base = struct.unpack_from('<Q', data, optional + 24)[0]
+            rva_count_offset = optional + 108
+        else:
+            raise Exception(f"Unknown PE optional header magic {magic:#x}: {path}")
+        self._rva_count = self.u32(rva_count_offset)
+        self._directories = rva_count_offset + 4
+        self._sections = list()
+        section = optional + size_of_optional_header
+        for _ in range(number_of_sections):
+            virtual_size, virtual_address, raw_size, raw_offset = \
+                struct.unpack_from('<IIII', data, section + 8)
+            self._sections.append(
+                (virtual_address, max(virtual_size, raw_size), raw_offset))
+            section += 40
+
+    def u16(self, offset : int) -> int:
+        return struct.unpack_from('<H', self._data, offset)[0]
+
+    def u32(self, offset : int) -> int:
+        return struct.unpack_from('<I', self._data, offset)[0]
+
+    def directory(self, index : int) -> tuple[int, int]:
+        """
+        The RVA and size of the given data directory.  (0, 0) if there is no such entry.
+        """
+        if index >= self._rva_count:
+            return (0, 0)
+        return struct.unpack_from('<II', self._data, self._directories + 8 * index)
+
+    def offset(self, rva : int) -> int:
+        """
+        The file offset of the given RVA.
+        """
+        for virtual_address, size, raw_offset in self._sections:
+            if virtual_address <= rva < virtual_address + size:
+                return rva - virtual_address + raw_offset
+        raise Exception(f"RVA {rva:#x} is outside every section: {self._path}")
+
+    def string(self, rva : int) -> str:
+        """
+        The NUL terminated string at the given RVA.
+        """
+        start = self.offset(rva)
+        end = self._data.find(b'\0', start)
+        if end < 0:
+            raise struct.error(f"unterminated string at {start:#x}")
+        return self._data[start:end].decode('latin1')
+
+
+def _imports(image : _Image) -> list[str]:
+    """
+    The DLL names of the import directory.  Each descriptor is 20 bytes and the list ends
+    with a descriptor of zeros.
+    """
+    names = list()
+    rva, size = image.directory(_IMPORT_DIRECTORY)
+    if rva == 0:
+        return names
+    descriptor = image.offset(rva)
+    while True:
+        original_first_thunk = image.u32(descriptor)
+        name_rva = image.u32(descriptor + 12)
+        first_thunk = image.u32(descriptor + 16)
+        if name_rva == 0 and original_first_thunk == 0 and first_thunk == 0:
+            break
+        names.append(image.string(name_rva))
+        descriptor += 20
+    return names
+
+
+def _delay_imports(image : _Image) -> list[str]:
+    """
+    The DLL names of the delay import directory.  Each descriptor is 32 bytes and the list
+    ends with a descriptor of zeros.  Old descriptors, without bit 0 of the attributes
+    set, hold VAs rather than RVAs.
+    """
+    names = list()
+    rva, size = image.directory(_DELAY_IMPORT_DIRECTORY)
+    if rva == 0:
+        return names
+    descriptor = image.offset(rva)
+    while True:
+        attributes = image.u32(descriptor)
+        name_rva = image.u32(descriptor + 4)
+        if name_rva == 0:
+            break
+        if not attributes & 1:
+            name_rva -= image.image_base
+        names.append(image.string(name_rva))
+        descriptor += 32
+    return names
+
+
+def imported_dlls(path : str | Path) -> list[str]:
+    """
+    The names of the DLLs imported by the given executable or DLL, from both its import
+    and delay import directories, in the order of the image.  This is the list that
+    `dumpbin /IMPORTS` prints, without running dumpbin.
+    """
+    path = Path(path)
+    with open(path, 'rb') as f:
+        if path.stat().st_size == 0:
+            raise Exception(f"Not a PE file (empty): {path}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            try:
+                image = _Image(data, path)
+                return _imports(image) + _delay_imports(image)
+            except struct.error:
+                raise Exception(f"Truncated PE file: {path}")
@@ -0,0 +1,69 @@
+import os
+import shutil
+import logging
+import tempfile
+import subprocess
+from pathlib import Path
+from functools import lru_cache
+from Packages.Cache import LRUCache
+from Packages.Settings import settings
+
+
+@lru_cache
+def _cache() -> LRUCache:
+    return LRUCache('pgo', settings().get('pgo_cache_mb', 512))
+
+
+def cached_pgd(key : str | None) -> Path | None:
+    """
+    The profile of the block of the given link key, if it was trained before.
+    """
+    if key is None:
+        return None
+    entry_dir = _cache().get(key)
+    if entry_dir is None:
+        return None
+    return entry_dir / 'target.pgd'
+
+
+def stage(key : str | None) -> Path:
+    """
+    An empty directory for the profile of a block and its training runs.  Without a key,
+    the profile is not cached.
+    """
+    if key is None:
+        return Path(tempfile.mkdtemp(prefix='invoke-msvc-pgo-'))
+    return _cache().stage(key)
+
+
+def commit(key : str | None, staging_dir : Path):
+    """
+    Save the trained profile in the cache.
+    """
+    if key is None:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return
+    for pgc in staging_dir.glob('*.pgc'):
+        pgc.unlink()  # Merged into the .pgd by the optimizing link.
+    _cache().commit(key, staging_dir)
+
+
+def discard(staging_dir : Path):
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def train(target : Path, profile_dir : Path):
+    """
+    Run the instrumented target once, in its own directory, so it writes its counts to
+    the profile directory.
+    """
+    env = dict(os.environ)
+    env['VCPROFILE_PATH'] = str(profile_dir)
+    logging.info("Training %s for profile guided optimization.", target)
+    cp = subprocess.run([str(target)], cwd=str(target.parent), env=env,
+                        stdin=subprocess.DEVNULL, capture_output=True, text=True,
+                        errors='replace',
+                        timeout=settings().get('pgo_training_seconds', 600))
+    if cp.returncode != 0:
+        raise Exception("The training run of profile guided optimization failed: \n"
+                        "{}".format(cp.stdout + cp.stderr))
@@ -0,0 +1,32 @@
+import os
+import json
+from pathlib import Path
+from functools import lru_cache
+
+
+@lru_cache
+def _profiles() -> dict:
+    profiles_path = Path(os.path.realpath(__file__)).with_name('profiles.json')
+    with open(profiles_path) as f:
+        return json.load(f)
+
+
+def load(name : str, backend : str) -> dict:
+    """
+    The build profile of the given name from profiles.json: the options it adds for the
+    compiler and the linker and, for profile guided optimization, those of the
+    instrumenting and optimizing links.  A profile may be only for some backends.
+    """
+    if name not in _profiles():
+        raise Exception(f"Unknown build profile: {name}")
+    profile = _profiles()[name]
+    if backend not in profile.get('backends', [backend]):
+        raise Exception(f"The build profile {name} is not for the {backend} backend.")
+    return profile
+
+
+def is_guided(profile : dict) -> bool:
+    """
+    Is the profile one of profile guided optimization?
+    """
+    return 'instrument_linker_options' in profile
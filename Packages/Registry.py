@@ -0,0 +1,102 @@
+import re
+import logging
+import importlib
+from types import MappingProxyType
+from dataclasses import dataclass
+import Packages.Timing as Timing
+
+# Each package: its name, its module and class, and the pattern of the args it takes from
+# the command line.  The module of a package is imported only when one of its args is
+# on the command line, except for Common, which is always used.
+_PACKAGES = [
+    ("common", "Packages.Common", "Common", r"-L.*"),
+    ("boost", "Packages.Boost", "Boost", r"-lboost(_.+)?$"),
+    ("vcpkg", "Packages.Vcpkg", "Vcpkg", r"-lvcpkg(_.+)?$"),
+    ("tbb", "Packages.OneAPI_TBB", "TBB", r"-loneapi_tbb"),
+]
+_ALWAYS_USED = {"common"}
+
+# The flags of this tool itself, which are taken from the command line before the flags of
+# the compiler:
+_tool_flag_regex = re.compile(r"-(no-)?(run-cache|fail-fast|header-units)$|-profile=\w+$|"
+                              r"-time-report$")
+_patterns = [(name, re.compile(pattern)) for name, _, _, pattern in _PACKAGES]
+
+
+@dataclass(frozen=True)
+class Request:
+    """
+    The command line from Org mode, classified: the target, the compiler flags, the
+    source, the libs for the linker, the args of each package on the command line, and
+    the flags of this tool.
+    """
+    target : str
+    flags : tuple[str, ...]
+    src_path : str
+    libs : tuple[str, ...]
+    package_args : MappingProxyType
+    tool_flags : frozenset[str] = frozenset()
+
+
+@Timing.timed('parse argv')
+def classify(argv : list[str]) -> Request:
+    """
+    Classify every arg of the command line in one pass.  The command line from Org mode
+    is: the program, -o and the target, the compiler flags, the .cpp source file, and
+    then the libs.  The args of a package may be anywhere after the program.
+    """
+    target = None
+    flags = list()
+    src_path = None
+    libs = list()
+    package_args = {name: list() for name in _ALWAYS_USED}
+    tool_flags = set()
+    expecting_target = False
+    for arg in argv[1:]:
+        if _tool_flag_regex.match(arg):
+            tool_flags.add(arg)
+            continue
+        for name, pattern in _patterns:
+            if pattern.match(arg):
+                package_args.setdefault(name, list()).append(arg)
+                break
+        else:
+            if expecting_target:
+                # Arg: output target filename prefixed with "-o"
+                target = arg
+                expecting_target = False
+            elif target is None:
+                if arg != "-o":
+                    raise Exception('Command line missing target filename.')
+                expecting_target = True
+            elif src_path is None:
+                if arg.endswith(".cpp"):
+                    src_path = arg  # Arg: source code filename
+                else:
+                    flags.append(arg)  # Arg: compiler flags, as the backend spells them
+            else:
+                libs.append(arg)  # Arg: libs for linker
+    if target is None:
+        raise Exception('Command line missing target filename.')
+    if src_path is None:
+        raise Exception('Command line missing source code filename.')
+    return Request(target, tuple(flags), src_path, tuple(libs),
+                   MappingProxyType({n: tuple(a) for n, a in package_args.items()}),
+                   frozenset(tool_flags))
+
+
+def construct(request : Request) -> dict:
+    """
+    Import and construct each package with args in the request, in the order of the
+    registry, from only its own args.
+    """
+    packages = dict()
+    for name, module_name, class_name, _ in _PACKAGES:
+        if name in request.package_args:
+            with Timing.span(f'import {module_name}'):
+                package_class = getattr(importlib.import_module(module_name), class_name)
+            with Timing.span(f'construct {class_name}', args=request.package_args[name]):
+                packages[name] = package_class(list(request.package_args[name]))
+            logging.debug("Constructed package %s from %s", name,
+                          request.package_args[name])
+    return packages
@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import logging
+import subprocess
+from pathlib import Path
+from functools import lru_cache
+import Packages.Backends as Backends
+from Packages.Cache import LRUCache, hash_file, hash_strings
+from Packages.FileLock import staging_path
+from Packages.Settings import cache_dir, settings
+
+_LAUNCHER_SRC = Path(os.path.realpath(__file__)).parent / 'RunLauncher.cpp'
+_RUN_SCRIPT = Path(os.path.realpath(__file__)).parent.parent / 'run.py'
+
+
+@lru_cache
+def _cache() -> LRUCache:
+    return LRUCache('run', settings().get('run_cache_mb', 256))
+
+
+def is_enabled(tool_flags : frozenset[str]) -> bool:
+    """
+    Should the output of the target be cached?  A block opts in with -run-cache, or out
+    with -no-run-cache, whatever the run_cache setting.
+    """
+    if '-no-run-cache' in tool_flags:
+        return False
+    return '-run-cache' in tool_flags or settings().get('run_cache', False)
+
+
+def _launcher() -> Path:
+    """
+    The launcher executable, built with the compiler of the current backend the first
+    time it is needed.
+    """
+    backend = Backends.current()
+    key = hash_strings([hash_file(_LAUNCHER_SRC), backend.toolchain_identity()])
+    launcher = cache_dir('launcher') / f'{key}.exe'
+    if launcher.exists():
+        return launcher
+    staging_dir = staging_path(cache_dir('launcher') / key)
+    staging_dir.mkdir(exist_ok=True)
+    cl_clo = [backend.compiler, "/nologo", "/O1", "/MT", "/EHsc", "/std:c++20",
+              "/Fo" + str(staging_dir / 'launcher.obj'),
+              "/Fe" + str(staging_dir / 'launcher.exe'), str(_LAUNCHER_SRC)]
+    logging.debug("launcher cl_clo == %s", cl_clo)
+    cp = subprocess.run(cl_clo, capture_output=True, text=True, cwd=str(staging_dir))
+    if cp.returncode != 0:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise Exception("Building the run cache launcher failed: \n{}".format(cp.stdout))
+    os.replace(staging_dir / 'launcher.exe', launcher)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return launcher
+
+
+def install(target : Path, dlls : set[Path]):
+    """
+    Put the launcher in the place of the target, so when Org mode runs the target its
+    output is replayed from the run cache.  The target is renamed to .real.exe, beside
+    its DLLs.
+    """
+    real_exe = target.with_name(target.stem + '.real.exe')
+    os.replace(target, real_exe)
+    shutil.copy2(_launcher(), target)
+    spec_path = target.with_suffix('.run.json')
+    with open(spec_path, 'w') as f:
+        json.dump({'exe': str(real_exe), 'dlls': sorted(str(d) for d in dlls)}, f)
+    target.with_suffix('.launch').write_text(
+        f'"{sys.executable}" "{_RUN_SCRIPT}" "{spec_path}"', encoding='utf-8')
+    logging.debug("Installed the run cache launcher for %s", target)
+
+
+def run(spec_path : Path, args : list[str]) -> int:
+    """
+    Run the target of the spec with the given args, or replay its output from the run
+    cache.  The key is the contents of the target and its DLLs, the args and stdin.
+    Only runs which succeed are cached.  Return the exit code of the target.
+    """
+    with open(spec_path) as f:
+        spec = json.load(f)
+    exe = Path(spec['exe'])
+    stdin = b'' if sys.stdin is None or sys.stdin.isatty() else sys.stdin.buffer.read()
+    # Org mode builds each evaluation into freshly named temp files, so only the
+    # contents of the target and the names of the DLLs are in the key.  They are hashed
+    # anew, as those temp files would only swell the cache of header hashes:
+    key = [hash_file(exe)] + [hash_file(Path(d)) for d in spec['dlls']]
+    key += [Path(d).name for d in spec['dlls']]
+    key += args
+    key.append(hashlib.sha256(stdin).hexdigest())
+    key = hash_strings(key)
+    entry_dir = _cache().get(key)
+    if entry_dir is not None:
+        logging.debug("Replayed from run cache: %s %s", exe, args)
+        sys.stdout.buffer.write((entry_dir / 'stdout').read_bytes())
+        sys.stderr.buffer.write((entry_dir / 'stderr').read_bytes())
+        return _cache().meta(key)['returncode']
+    cp = subprocess.run([str(exe)] + args, input=stdin, capture_output=True)
+    sys.stdout.buffer.write(cp.stdout)
+    sys.stderr.buffer.write(cp.stderr)
+    if cp.returncode == 0:
+        staging_dir = _cache().stage(key)
+        (staging_dir / 'stdout').write_bytes(cp.stdout)
+        (staging_dir / 'stderr').write_bytes(cp.stderr)
+        _cache().commit(key, staging_dir, {'exe': exe.name, 'args': args,
+                                           'returncode': cp.returncode})
+        logging.debug("Saved in run cache: %s %s", exe, args)
+    return cp.returncode
@@ -0,0 +1,50 @@
+// The launcher which takes the place of a target built with -run-cache.  Org mode runs
+// it as it would the target; it runs the command line in the .launch file beside it, with
+// its own args appended, so the output of the target is replayed from the run cache.
+#include <windows.h>
+#include <string>
+
+int wmain()
+{
+    wchar_t self[MAX_PATH];
+    DWORD n = GetModuleFileNameW(nullptr, self, MAX_PATH);
+    if (n == 0 || n == MAX_PATH)
+        return 127;
+    std::wstring launch_path(self, n);
+    launch_path.replace(launch_path.rfind(L'.'), std::wstring::npos, L".launch");
+
+    HANDLE f = CreateFileW(launch_path.c_str(), GENERIC_READ, FILE_SHARE_READ, nullptr,
+                           OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, nullptr);
+    if (f == INVALID_HANDLE_VALUE)
+        return 127;
+    char utf8[8192];
+    DWORD size = 0;
+    BOOL ok = ReadFile(f, utf8, sizeof(utf8), &size, nullptr);
+    CloseHandle(f);
+    if (!ok || size == 0 || size == sizeof(utf8))
+        return 127;
+    std::wstring command_line(MultiByteToWideChar(CP_UTF8, 0, utf8, size, nullptr, 0), L'\0');
+    MultiByteToWideChar(CP_UTF8, 0, utf8, size, command_line.data(), (int)command_line.size());
+
+    // Append the args of the launcher, which follow its own quoted or unquoted name:
+    const wchar_t* args = GetCommandLineW();
+    if (*args == L'"') {
+        for (++args; *args && *args != L'"'; ++args) {}
+        if (*args) ++args;
+    } else {
+        for (; *args && *args != L' ' && *args != L'\t'; ++args) {}
+    }
+    command_line += args;
+
+    STARTUPINFOW si = { sizeof(si) };
+    PROCESS_INFORMATION pi;
+    if (!CreateProcessW(nullptr, command_line.data(), nullptr, nullptr, TRUE, 0, nullptr,
+                        nullptr, &si, &pi))
+        return 127;
+    WaitForSingleObject(pi.hProcess, INFINITE);
+    DWORD exit_code = 127;
+    GetExitCodeProcess(pi.hProcess, &exit_code);
+    CloseHandle(pi.hThread);
+    CloseHandle(pi.hProcess);
+    return (int)exit_code;
+}
@@ -0,0 +1,40 @@
+import os
+import json
+from pathlib import Path
+from functools import lru_cache
+
+
+_SETTINGS_PATH = Path(os.path.realpath(__file__)).with_name('settings.json')
+
+
+def settings() -> dict:
+    """
+    The settings of this tool, read from the json file beside this script.  They are read
+    again when the file changes, as it may while the compile server runs.
+    """
+    try:
+        mtime_ns = _SETTINGS_PATH.stat().st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    return _read_settings(mtime_ns)
+
+
+@lru_cache(maxsize=1)
+def _read_settings(mtime_ns : int | None) -> dict:
+    if mtime_ns is not None:
+        with open(_SETTINGS_PATH) as f:
+            return(json.load(f))
+    else:
+        return(dict())
+
+
+def cache_dir(name : str) -> Path:
+    """
+    The directory of the named on-disk cache.  The root of all caches is either the
+    INVOKE_MSVC_CACHE_DIR environment variable or the cache_dir setting.
+    """
+    root = os.environ.get('INVOKE_MSVC_CACHE_DIR',
+                          settings().get('cache_dir', '~/.invoke-msvc-cache'))
+    d = Path(root).expanduser() / name
+    d.mkdir(parents=True, exist_ok=True)
+    return(d)
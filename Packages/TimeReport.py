@@ -0,0 +1,99 @@
+import re
+from pathlib import Path
+from Packages.Settings import settings
+
+# The switches of cl.exe which report the time of its phases (/Bt+), of each include,
+# class and function of the front end (/d1reportTime), and of the functions slowest to
+# generate code for (/d2cgsummary):
+OPTIONS = ["/Bt+", "/d1reportTime", "/d2cgsummary"]
+
+# The sections of the reports, each of whose entries is a kind of cost:
+_SECTIONS = {'Include Headers:': 'Include', 'Class Definitions:': 'Class',
+             'Function Definitions:': 'Function', 'Code Generation Summary': None,
+             'RdrReadProc Caching Stats': None}
+_KINDS = ['Phase', 'Include', 'Class', 'Function', 'Codegen']
+_PHASES = {'c1xx': 'front end', 'c1': 'front end', 'c2': 'back end'}
+
+_phase_regex = re.compile(r'time\((.+?)\)=(\d+(?:\.\d+)?)s')
+_entry_regex = re.compile(r'(\t+)(.+?): (\d+(?:\.\d+)?)\s*(?:s|sec)\b')
+# An indented line of a report: a summary, with a count or a time, such as '\tCount: 212',
+# or an entry, with a time, such as '\t\tmain: 0.031502s' or
+# '\t\tmain: 0.412 sec, 10231 instrs':
+_report_regex = re.compile(r'\t[^\t].*: \d+(?:\.\d+)?(?: sec)?|'
+                           r'\t+[^\t].*: \d+(?:\.\d+)?(?:s| sec(?:, \d+ instrs)?)')
+# The file(line): with which a diagnostic, or a note of one, starts:
+_location_regex = re.compile(r'\(\d+(?:,\d+)?\)\s*:')
+
+
+def is_enabled(tool_flags : frozenset[str]) -> bool:
+    return '-time-report' in tool_flags
+
+
+def is_report_line(line : str) -> bool:
+    """
+    Is the line of the output of cl.exe part of its timing reports, rather than a
+    diagnostic?  The lines of the reports are indented with tabs and end with a count or
+    a time, while the indented notes of a diagnostic start with the file and line.
+    """
+    line = line.rstrip('\r\n')
+    if line.rstrip() in _SECTIONS or _phase_regex.match(line):
+        return True
+    return bool(_report_regex.fullmatch(line)) and not _location_regex.search(line)
+
+
+def parse(lines : list[str]) -> list[tuple[str, str, float]]:
+    """
+    The costs in the timing reports of cl.exe: the kind, name and seconds of each phase,
+    include, class and function definition, and function slow to generate code for.  An
+    include is timed with the headers it includes, and only its costliest inclusion is
+    kept.  Class and function definitions include template instantiations.
+    """
+    costs = dict()
+    kind = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        m = _phase_regex.match(line)
+        if m:
+            phase = Path(m.group(1).replace('\\', '/')).stem.lower()
+            costs[('Phase', _PHASES.get(phase, phase))] = float(m.group(2))
+            continue
+        if line in _SECTIONS:
+            kind = _SECTIONS[line]
+            continue
+        if line.startswith('\t') and not line.startswith('\t\t'):
+            # A summary line, or the heading of the functions slow to generate code for:
+            if line.strip().startswith('Anomalistic Compile Times'):
+                kind = 'Codegen'
+            elif kind == 'Codegen':
+                kind = None
+            continue
+        m = _entry_regex.match(line)
+        if m and kind is not None:
+            key = (kind, m.group(2).strip())
+            costs[key] = max(costs.get(key, 0.0), float(m.group(3)))
+    return [(kind, name, seconds) for (kind, name), seconds in costs.items()]
+
+
+def org_table(costs : list[tuple[str, str, float]], rows : int = None) -> str:
+    """
+    An org table of the costs, ranked within each kind, with at most rows of each kind.
+    """
+    if rows is None:
+        rows = settings().get('time_report_rows', 15)
+    lines = ['| Kind | Rank | Seconds | Name |', '|------+------+---------+------|']
+    for kind in _KINDS:
+        ranked = sorted((c for c in costs if c[0] == kind), key=lambda c: -c[2])
+        for rank, (_, name, seconds) in enumerate(ranked[:rows], 1):
+            lines.append(f"| {kind} | {rank} | {seconds:.3f} | "
+                         f"{name.replace('|', '¦')} |")
+    return '\n'.join(lines) + '\n'
+
+
+def save(target : Path, table : str) -> Path:
+    """
+    Save the table beside the target, as <target>.time-report.org.
+    """
+    report_path = target.with_suffix('.time-report.org')
+    report_path.write_text(f'#+TITLE: Compile time of {target.name}\n\n{table}',
+                           encoding='utf-8')
+    return report_path
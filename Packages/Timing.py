@@ -0,0 +1,109 @@
+import os
+import time
+import itertools
+import json
+import logging
+import threading
+import functools
+import contextlib
+from pathlib import Path
+
+# Set this environment variable to 1 to time the phases of each invocation, or to the
+# directory in which to write the traces:
+ENV_VAR = 'INVOKE_MSVC_TIMING'
+
+_enabled = bool(os.environ.get(ENV_VAR))
+_events = list()  # (name, start ns, duration ns, thread id, args) of each finished span.
+_NULL_SPAN = contextlib.nullcontext()
+_report_numbers = itertools.count()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class _Span:
+    """
+    A timed span of an invocation, recorded when it exits.
+    """
+    __slots__ = ('_name', '_args', '_start')
+
+    def __init__(self, name : str, args : dict):
+        self._name = name
+        self._args = args
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        _events.append((self._name, self._start, time.perf_counter_ns() - self._start,
+                        threading.get_ident(), self._args))
+        return False
+
+
+def span(name : str, **args):
+    """
+    A context manager which times the code within it, with the given args shown in the
+    trace.  When timing is off, it is one shared context manager which does nothing.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def timed(name : str):
+    """
+    A decorator which times each call of the function.  When timing is off, the function
+    is returned as it is.
+    """
+    def decorator(f):
+        if not _enabled:
+            return f
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            with _Span(name, {}):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _trace_dir() -> Path:
+    value = os.environ[ENV_VAR]
+    if value == '1':
+        from Packages.Settings import cache_dir
+        return cache_dir('timing')
+    trace_dir = Path(value).expanduser()
+    trace_dir.mkdir(parents=True, exist_ok=True)
+    return trace_dir
+
+
+def report():
+    """
+    Write the spans recorded since the last report: a summary of the time in each, to
+    the log, and every span, as a Chrome trace-event file which chrome://tracing or
+    Perfetto can show.
+    """
+    if not _enabled or not _events:
+        return
+    events = list(_events)
+    _events.clear()
+    totals = dict()
+    for name, _, duration, _, _ in events:
+        count, total, longest = totals.get(name, (0, 0, 0))
+        totals[name] = (count + 1, total + duration, max(longest, duration))
+    lines = ["Timing summary:",
+             f"{'Span':<32} {'Count':>6} {'Total ms':>10} {'Max ms':>10}"]
+    for name, (count, total, longest) in sorted(totals.items(), key=lambda t: -t[1][1]):
+        lines.append(f"{name:<32} {count:>6} {total / 1e6:>10.2f} {longest / 1e6:>10.2f}")
+    logging.info('\n'.join(lines))
+    trace = {'displayTimeUnit': 'ms',
+             'traceEvents': [{'name': name, 'ph': 'X', 'ts': start / 1000,
+                              'dur': duration / 1000, 'pid': os.getpid(), 'tid': tid,
+                              'args': args}
+                             for name, start, duration, tid, args in events]}
+    name = f'trace-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{next(_report_numbers)}'
+    path = _trace_dir() / f'{name}.json'
+    with open(path, 'w') as f:
+        json.dump(trace, f)
+    logging.info('Wrote timing trace %s', path)
@@ -1,9 +1,9 @@
 import os
 import re
 import json
-from overrides import overrides
 from pathlib import Path
-from Packages.IPackage import IPackage
+from Packages.IPackage import IPackage, overrides
+from Packages.LibIndex import libs_with_prefix
 
 class Vcpkg(IPackage):
     """
@@ -67,19 +67,12 @@ class Vcpkg(IPackage):
                     remainder_argv.append(arg)
         self._argv = remainder_argv  # Keep the args not used in this package.
 
-        # Find the Vcpkg release lib files:
+        # Find the Vcpkg release and debug lib files in the index of each lib dir:
         self._release_libs = list()
-        lib_paths = list(self.lib_dir.glob('*.lib')) # All libs in the lib dir.
-        for requested_lib in requested_libs:
-            found_libs = [str(n) for n in lib_paths if n.stem.startswith(requested_lib)]
-            self._release_libs.extend(found_libs)
-
-        # Find the Vcpkg debug lib files:
         self._debug_libs = list()
-        lib_paths = list(self.debug_lib_dir.glob('*.lib')) # All libs in the debug lib dir.
         for requested_lib in requested_libs:
-            found_libs = [str(n) for n in lib_paths if n.stem.startswith(requested_lib)]
-            self._debug_libs.extend(found_libs)
+            self._release_libs.extend(libs_with_prefix(self.lib_dir, requested_lib))
+            self._debug_libs.extend(libs_with_prefix(self.debug_lib_dir, requested_lib))
 
     @property
     @overrides
@@ -0,0 +1,18 @@
+import json
+import socket
+
+
+def send_message(sock : socket.socket, message : dict):
+    """
+    Send one message, as a line of json.
+    """
+    sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+
+
+def receive_messages(sock : socket.socket):
+    """
+    Yield each message, a line of json, until the connection closes.
+    """
+    with sock.makefile('r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
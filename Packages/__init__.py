@@ -1,5 +1,18 @@
-from .Boost import Boost
-from .Common import Common
-from .IPackage import IPackage
-from .Vcpkg import Vcpkg
-from .OneAPI_TBB import TBB
+import importlib
+
+# The packages are imported only when first used, so that an invocation imports only
+# the packages it asks for:
+_lazy_attributes = {
+    'Boost': '.Boost',
+    'Common': '.Common',
+    'IPackage': '.IPackage',
+    'Vcpkg': '.Vcpkg',
+    'TBB': '.OneAPI_TBB',
+}
+
+
+def __getattr__(name : str):
+    if name in _lazy_attributes:
+        module = importlib.import_module(_lazy_attributes[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
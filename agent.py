@@ -0,0 +1,141 @@
+"""
+A build agent, to which invocations send the preprocessed sources of their blocks to be
+compiled.  It answers each request on its own thread, and compiles at most --slots
+sources at once; invocations send their sources to the agent with the most free slots.
+
+    python agent.py --port 7000 --slots 8 --token <secret>
+
+To try the whole path on one Linux box, run it with the stub compiler of the benchmarks:
+
+    python benchmarks/fixtures.py write-stubs /tmp/stubs
+    python agent.py --port 7000 --compiler /tmp/stubs/cl.exe --no-msvc-env
+"""
+import os
+import base64
+import socket
+import ipaddress
+import logging
+import secrets
+import argparse
+import tempfile
+import threading
+import traceback
+from pathlib import Path
+import Packages.Diagnostics as Diagnostics
+import Packages.Log as Log
+import Packages.MSVC2022 as MSVC2022
+from Packages.Wire import send_message, receive_messages
+
+
+class Agent:
+    """
+    The state of the agent: its slots and how many of them are busy.
+    """
+
+    def __init__(self, compiler : str, slots : int, token : str):
+        self.compiler = compiler
+        self.slots = slots
+        self.token = token
+        self.running = 0
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(slots)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {'running': self.running, 'slots': self.slots}
+
+    def compile(self, job : dict) -> dict:
+        """
+        Compile one preprocessed source in a temp directory, and return the output of the
+        compiler and the object file.
+        """
+        with self._slots:
+            with self._lock:
+                self.running += 1
+            try:
+                with tempfile.TemporaryDirectory(prefix='invoke-msvc-agent-') as work:
+                    src = Path(work) / Path(job['name']).name
+                    src.write_bytes(base64.b64decode(job['source']))
+                    obj = src.with_suffix('.obj')
+                    clo = [self.compiler] + job['options'] + \
+                        ['/c', '/Fo' + str(obj), job['language'] + str(src)]
+                    logging.debug("clo == %s", clo)
+                    cp = Diagnostics.run_tool(clo, cwd=work, echo=False)
+                    reply = {'exit': cp.returncode, 'output': cp.text}
+                    if cp.returncode == 0:
+                        reply['obj'] = base64.b64encode(obj.read_bytes()).decode()
+                    return reply
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+
+def _serve_request(agent : Agent, sock : socket.socket):
+    with sock:
+        try:
+            request = next(receive_messages(sock), None)
+            if request is None:
+                return
+            if not secrets.compare_digest(request.get('token', ''), agent.token):
+                send_message(sock, {'error': 'Wrong agent token.'})
+            elif 'status' in request:
+                send_message(sock, agent.status())
+            elif 'compile' in request:
+                try:
+                    send_message(sock, agent.compile(request['compile']))
+                except OSError as e:
+                    send_message(sock, {'error': f'Cannot compile: {e}'})
+        except (OSError, ValueError):
+            logging.debug('Lost the connection to a client: %s', traceback.format_exc())
+
+
+def is_loopback(host : str) -> bool:
+    """
+    Is every address of host one of this machine only, so no other machine can reach it?
+    """
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except OSError:
+        return False
+    return all(ipaddress.ip_address(a.split('%')[0]).is_loopback for a in addresses)
+
+
+def serve(agent : Agent, host : str, port : int):
+    """
+    Serve requests until interrupted.
+    """
+    with socket.create_server((host, port)) as listener:
+        logging.info('Build agent listening on %s:%s with %s slots',
+                     host, listener.getsockname()[1], agent.slots)
+        while True:
+            sock, _ = listener.accept()
+            threading.Thread(target=_serve_request, args=(agent, sock),
+                             daemon=True).start()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='the address to listen on (default: only this machine)')
+    parser.add_argument('--port', type=int, default=7000)
+    parser.add_argument('--slots', type=int, default=os.cpu_count() or 1,
+                        help='the number of sources compiled at once')
+    parser.add_argument('--token', default='',
+                        help='the secret which invocations send, as their agent_token '
+                        '(default: none on loopback, else a generated one)')
+    parser.add_argument('--compiler', default='cl.exe')
+    parser.add_argument('--no-msvc-env', action='store_true',
+                        help='do not set up the environment of MSVC 2022')
+    args = parser.parse_args()
+    Log.setup()
+    if not args.token and not is_loopback(args.host):
+        # Anyone who can reach the port could run the compiler with any options:
+        args.token = secrets.token_hex(16)
+        print(f'Set agent_token to {args.token} to use this agent.', flush=True)
+    if not args.no_msvc_env:
+        MSVC2022.setup_env()
+    try:
+        serve(Agent(args.compiler, args.slots, args.token), args.host, args.port)
+    except KeyboardInterrupt:
+        pass
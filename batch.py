@@ -0,0 +1,103 @@
+"""
+Build many blocks in parallel.  The jobs are read from a json file, which holds a list of
+jobs such as:
+
+    {"source": "C-src-1.cpp", "target": "C-bin-1.exe", "flags": ["-DN=3"],
+     "libs": ["-lvcpkg_tbb"], "cwd": "path/of/the/org/file"}
+
+Each job is built as main.py would build it, by a pool of worker processes.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import traceback
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import Packages.Backends as Backends
+import Packages.Cache as Cache
+import Packages.Log as Log
+import Packages.Timing as Timing
+from Invocation import Invocation
+
+
+def job_argv(job : dict) -> list[str]:
+    """
+    The command line of main.py for a job.
+    """
+    if 'argv' in job:
+        return job['argv']
+    return ['main.py', '-o', job['target']] + job.get('flags', []) + \
+        [job['source']] + job.get('libs', [])
+
+
+def job_name(job : dict) -> str:
+    """
+    The target of a job, or its command line if that names no target.
+    """
+    argv = job_argv(job)
+    if '-o' in argv[:-1]:
+        return argv[argv.index('-o') + 1]
+    return ' '.join(argv[1:])
+
+
+def build(job : dict) -> tuple[float, str | None]:
+    """
+    Build the target of one job in a worker process.  Return the wall time of the build
+    and the error, if it failed.
+    """
+    start_time = time.perf_counter()
+    error = None
+    try:
+        argv = job_argv(job)
+        logging.debug("sys.arv == %s", argv)
+        Invocation(argv, cwd=job.get('cwd')).run()
+    except Exception:
+        error = traceback.format_exc()
+        logging.debug("Job failed: %s", error)
+    finally:
+        Timing.report()
+        Cache.save_counts()
+    return time.perf_counter() - start_time, error
+
+
+def run(jobs : list[dict], max_workers : int) -> int:
+    """
+    Build all the jobs and print the wall time of each, and of all, as an org table.
+    Return the number of failed jobs.
+    """
+    start_time = time.perf_counter()
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=Log.setup) as pool:
+        futures = {pool.submit(build, job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    total_time = time.perf_counter() - start_time
+    failures = 0
+    print("| Target | Seconds | Result |")
+    print("|--------+---------+--------|")
+    for job, (seconds, error) in zip(jobs, results):
+        target = job_name(job)
+        print(f"| {target} | {seconds:.3f} | {'failed' if error else 'ok'} |")
+        if error:
+            failures += 1
+            sys.stderr.write(f"{target}:\n{error}\n")
+    print(f"| Total ({len(jobs)} jobs, {max_workers} workers) | {total_time:.3f} | "
+          f"{failures} failed |")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('jobs', type=Path, help='the json file of jobs')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='the number of worker processes (default: the core count)')
+    args = parser.parse_args()
+    Log.setup()
+    Backends.current().setup_env()
+    with open(args.jobs) as f:
+        jobs = json.load(f)
+    sys.exit(1 if run(jobs, args.workers) else 0)
@@ -0,0 +1,218 @@
+"""
+Fixtures for the benchmarks, which run on Linux without Visual Studio: PE files with
+given imports, stubs of cl.exe, link.exe, dumpbin and cmd.exe, and synthetic vcpkg, Boost
+and TBB installations with thousands of libs and chains of DLLs.
+
+The stubs are configured by environment variables:
+
+    STUB_CL_DELAY, STUB_LINK_DELAY, STUB_DUMPBIN_DELAY, STUB_CMD_DELAY
+        the seconds each stub sleeps, as if it were working
+    STUB_CL_OUTPUT
+        extra text for cl.exe to print, such as warnings
+    STUB_LINK_IMPORTS
+        the comma separated DLLs which the target written by link.exe imports
+    STUB_CMD_PATH
+        the directory which cmd.exe prepends to the PATH it prints for set, as if a
+        vars.bat had run
+"""
+import os
+import re
+import sys
+import time
+import struct
+from pathlib import Path
+
+_STUBS = {'cl.exe': 'cl', 'link.exe': 'link', 'dumpbin': 'dumpbin',
+          'dumpbin.exe': 'dumpbin', 'cmd.exe': 'cmd'}
+_SYSTEM_DLLS = ['KERNEL32.dll', 'VCRUNTIME140.dll', 'api-ms-win-crt-runtime-l1-1-0.dll']
+
+
+def make_pe(imports : list[str], delay_imports : list[str] = []) -> bytes:
+    """
+    A minimal PE32+ image whose import and delay-import tables name the given DLLs.  It
+    has one section, which holds both tables and the names.
+    """
+    base = 0x1000
+    desc_size = 20 * (len(imports) + 1)
+    delay_desc_size = 32 * (len(delay_imports) + 1)
+    names = b''
+    name_rvas = list()
+    for name in list(imports) + list(delay_imports):
+        name_rvas.append(base + desc_size + delay_desc_size + len(names))
+        names += name.encode('ascii') + b'\0'
+    section = b''
+    for rva in name_rvas[:len(imports)]:
+        section += struct.pack('<IIIII', 0, 0, 0, rva, 1)
+    section += b'\0' * 20
+    for rva in name_rvas[len(imports):]:
+        section += struct.pack('<IIIIIIII', 1, rva, 0, 0, 0, 0, 0, 0)
+    section += b'\0' * 32
+    section += names
+    section = section.ljust((len(section) + 0x1ff) // 0x200 * 0x200, b'\0')
+    dos_header = b'MZ' + b'\0' * 58 + struct.pack('<I', 0x40)
+    coff_header = struct.pack('<HHIIIHH', 0x8664, 1, 0, 0, 0, 240, 0x22)
+    optional_header = struct.pack('<HBBIIIIIQIIHHHHHHIIIIHHQQQQII', 0x20b, 14, 0,
+                                  len(section), 0, 0, 0, base, 0x140000000, 0x1000, 0x200,
+                                  6, 0, 0, 0, 6, 0, 0, base + len(section), 0x200, 0, 3,
+                                  0x8160, 0x100000, 0x1000, 0x100000, 0x1000, 0, 16)
+    directories = [(0, 0)] * 16
+    directories[1] = (base, desc_size)
+    if delay_imports:
+        directories[13] = (base + desc_size, delay_desc_size)
+    optional_header += b''.join(struct.pack('<II', *d) for d in directories)
+    section_header = struct.pack('<8sIIIIIIHHI', b'.idata', len(section), base,
+                                 len(section), 0x200, 0, 0, 0, 0, 0xC0000040)
+    headers = dos_header + b'PE\0\0' + coff_header + optional_header + section_header
+    return headers.ljust(0x200, b'\0') + section
+
+
+def read_imports(path : Path) -> list[str]:
+    """
+    The DLLs imported by a PE image written by make_pe(), for the dumpbin stub.
+    """
+    data = Path(path).read_bytes()
+    pe = struct.unpack_from('<I', data, 0x3c)[0]
+    optional = pe + 24
+    section = optional + 240
+    _, _, va, _, raw = struct.unpack_from('<8sIIII', data, section)
+
+    def name_at(rva):
+        offset = rva - va + raw
+        return data[offset:data.index(b'\0', offset)].decode('ascii')
+
+    dlls = list()
+    import_rva, _ = struct.unpack_from('<II', data, optional + 112 + 8)
+    offset = import_rva - va + raw
+    while any(data[offset:offset + 20]):
+        dlls.append(name_at(struct.unpack_from('<IIIII', data, offset)[3]))
+        offset += 20
+    delay_rva, _ = struct.unpack_from('<II', data, optional + 112 + 13 * 8)
+    if delay_rva:
+        offset = delay_rva - va + raw
+        while any(data[offset:offset + 32]):
+            dlls.append(name_at(struct.unpack_from('<II', data, offset)[1]))
+            offset += 32
+    return dlls
+
+
+def _run_stub(tool : str, args : list[str]) -> int:
+    """
+    Do what the stubbed tool would, as far as the code under benchmark can tell.
+    """
+    time.sleep(float(os.environ.get(f'STUB_{tool.upper()}_DELAY', '0')))
+    imports = [i for i in os.environ.get('STUB_LINK_IMPORTS', '').split(',') if i]
+    if tool == 'cl':
+        for arg in args:
+            if arg.startswith(('/Fo', '/Fp')):
+                Path(arg[3:]).write_bytes(b'stub')
+            elif arg.startswith('/Fi') and '/P' in args:
+                Path(arg[3:]).write_bytes(Path(args[-1]).read_bytes())  # Preprocessed.
+            elif '/c' not in args and arg.startswith('/Fe'):
+                Path(arg[3:]).write_bytes(make_pe(imports))
+            elif '/c' not in args and arg.lower().startswith('/out:'):
+                Path(arg[5:]).write_bytes(make_pe(imports))  # Linked after /link.
+        if '/showIncludes' in args and args:
+            src = Path(args[-1])
+            dirs = [src.parent] + [Path(a[2:]) for a in args if a.startswith('/I')]
+            text = src.read_text(errors='replace')
+            for name in re.findall(r'#\s*include\s*"([^"]+)"', text):
+                for d in dirs:
+                    if (d / name).is_file():
+                        print(f'Note: including file: {(d / name).resolve()}')
+                        break
+        print(os.environ.get('STUB_CL_OUTPUT', ''))
+    elif tool == 'link':
+        for arg in args:
+            if arg.lower().startswith('/out:'):
+                Path(arg[5:]).write_bytes(make_pe(imports))
+    elif tool == 'dumpbin':
+        print(f'Dump of file {args[-1]}\n\n  Section contains the following imports:\n')
+        for dll in read_imports(Path(args[-1])):
+            print(f'    {dll}')
+    elif tool == 'cmd':
+        if args and args[-1] == 'set':
+            # As a vars.bat would, prepend to PATH:
+            path = [os.environ.get('STUB_CMD_PATH', '')] + \
+                os.environ.get('PATH', '').split(os.pathsep)
+            sys.stdout.buffer.write(f"PATH={';'.join(path)}\r\n"
+                                    "STUB_VARS_BAT=1\r\n".encode('latin1'))
+    return 0
+
+
+def write_stub_tools(bin_dir : Path) -> Path:
+    """
+    Write the stub tools into bin_dir, as shell scripts which run this module.
+    """
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, tool in _STUBS.items():
+        path = bin_dir / name
+        script = Path(__file__).resolve()
+        path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" {tool} "$@"\n')
+        path.chmod(0o755)
+    return bin_dir
+
+
+def _write_dll_chain(dll_dir : Path, names : list[str]):
+    """
+    Write DLLs which each import the next, and some system DLLs.
+    """
+    for i, name in enumerate(names):
+        imports = names[i + 1:i + 2] + _SYSTEM_DLLS
+        (dll_dir / name).write_bytes(make_pe(imports))
+
+
+def make_trees(root : Path, lib_count : int, chain_length : int) -> tuple[dict, dict]:
+    """
+    Create synthetic vcpkg, Boost and TBB installations under root, each with lib_count
+    libs, and a chain of chain_length DLLs behind the tbb12.dll of vcpkg.  Return the
+    environment variables which point at them, and the DLLs which a linked target should
+    import for each.
+    """
+    vcpkg = root / 'vcpkg'
+    installed = vcpkg / 'installed' / 'x64-windows'
+    for d in ['include', 'lib', 'bin', 'debug/lib', 'debug/bin']:
+        (installed / d).mkdir(parents=True, exist_ok=True)
+    for i in range(lib_count):
+        for d in ['lib', 'debug/lib']:
+            (installed / d / f'port{i:05}.lib').write_bytes(b'')
+    chain = [f'chain{i:03}.dll' for i in range(chain_length)]
+    _write_dll_chain(installed / 'bin', ['tbb12.dll'] + chain)
+    for d in ['lib', 'debug/lib']:
+        (installed / d / 'tbb12.lib').write_bytes(b'')
+        (installed / d / 'tbb.lib').write_bytes(b'')
+
+    boost_lib = root / 'boost' / 'lib'
+    boost_root = root / 'boost' / 'include' / 'boost-1_82'
+    boost_root.mkdir(parents=True, exist_ok=True)
+    boost_lib.mkdir(parents=True, exist_ok=True)
+    for i in range(lib_count):
+        for variant in ['mt-x64', 'mt-gd-x64']:
+            (boost_lib / f'boost_lib{i:05}-vc143-{variant}-1_82.lib').write_bytes(b'')
+            (boost_lib / f'libboost_lib{i:05}-vc143-{variant}-1_82.lib').write_bytes(b'')
+    for variant in ['mt-x64', 'mt-gd-x64']:
+        (boost_lib / f'boost_filesystem-vc143-{variant}-1_82.lib').write_bytes(b'')
+    _write_dll_chain(boost_lib, ['boost_filesystem-vc143-mt-x64-1_82.dll'])
+
+    tbb = root / 'tbb'
+    for d in ['include', 'env', 'lib/intel64/vc14', 'redist/intel64/vc14']:
+        (tbb / d).mkdir(parents=True, exist_ok=True)
+    (tbb / 'env' / 'vars.bat').write_text('@echo off\n')
+    for i in range(lib_count):
+        (tbb / 'lib' / 'intel64' / 'vc14' / f'tbb_extra{i:05}.lib').write_bytes(b'')
+    for name in ['tbb12.lib', 'tbb12_debug.lib']:
+        (tbb / 'lib' / 'intel64' / 'vc14' / name).write_bytes(b'')
+    _write_dll_chain(tbb / 'redist' / 'intel64' / 'vc14', ['tbb12.dll'])
+
+    env = {'VCPKG_ROOT': str(vcpkg), 'BOOST_ROOT': str(boost_root), 'TBB_ROOT': str(tbb),
+           'STUB_CMD_PATH': str(tbb / 'redist' / 'intel64' / 'vc14')}
+    imports = {'vcpkg': ['tbb12.dll'],
+               'boost': ['boost_filesystem-vc143-mt-x64-1_82.dll'],
+               'tbb': ['tbb12.dll']}
+    return env, imports
+
+
+if __name__ == '__main__':
+    if sys.argv[1] == 'write-stubs':
+        write_stub_tools(Path(sys.argv[2]))
+        sys.exit(0)
+    sys.exit(_run_stub(sys.argv[1], sys.argv[2:]))
@@ -0,0 +1,79 @@
+"""
+Benchmark the startup time of an invocation: importing Invocation and parsing the command
+line of a block, each in a fresh Python process as Org mode would start it.  Run it from a
+checkout of each commit to compare them:
+
+    python benchmarks/startup.py --runs 20
+    python benchmarks/startup.py --repo ../baseline-checkout --runs 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+# Each scenario is the Python code run in a fresh process.  The time reported is that of
+# the whole process, as seen by Emacs.
+SCENARIOS = {
+    'import': "import Invocation",
+    'plain-block': "import Invocation; "
+                   "Invocation.Invocation(['main.py', '-o', 't.exe', 'src.cpp'])",
+}
+
+# Scenarios of the packages, which are run only when the root of the package is set:
+PACKAGE_SCENARIOS = {
+    'tbb-block': ('TBB_ROOT',
+                  "import Invocation; Invocation.Invocation("
+                  "['main.py', '-o', 't.exe', 'src.cpp', '-loneapi_tbb'])"),
+    'vcpkg-block': ('VCPKG_ROOT',
+                    "import Invocation; Invocation.Invocation("
+                    "['main.py', '-o', 't.exe', 'src.cpp', '-lvcpkg_tbb'])"),
+}
+
+
+def time_scenario(repo : Path, code : str, runs : int, env : dict) -> list[float]:
+    """
+    The wall time, in seconds, of each run of the code in a fresh process.
+    """
+    times = list()
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=str(repo), env=env, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repo', type=Path,
+                        default=Path(__file__).resolve().parent.parent,
+                        help='the checkout to benchmark')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--check-interfaces', action='store_true',
+                        help='also set INVOKE_MSVC_CHECK_INTERFACES, as when testing')
+    args = parser.parse_args()
+    env = dict(os.environ)
+    if args.check_interfaces:
+        env['INVOKE_MSVC_CHECK_INTERFACES'] = '1'
+    baseline = time_scenario(args.repo, "pass", args.runs, env)
+    results = {'repo': str(args.repo.resolve()), 'runs': args.runs,
+               'python_startup_ms': 1000 * statistics.median(baseline)}
+    scenarios = dict(SCENARIOS)
+    for name, (root, code) in PACKAGE_SCENARIOS.items():
+        if root in env:
+            scenarios[name] = code
+    for name, code in scenarios.items():
+        times = time_scenario(args.repo, code, args.runs, env)
+        results[name] = {'median_ms': 1000 * statistics.median(times),
+                         'min_ms': 1000 * min(times),
+                         'over_python_startup_ms': 1000 * (statistics.median(times) -
+                                                           statistics.median(baseline))}
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+Benchmark whole invocations on Linux, with stubs in place of cl.exe, link.exe, dumpbin and
+cmd.exe, and synthetic vcpkg, Boost and TBB installations.  Each run of a scenario is
+timed in a fresh Python process.  Run it from a checkout of each commit, or point it at
+one, and compare the JSON results:
+
+    python benchmarks/suite.py --runs 10 > after.json
+    python benchmarks/suite.py --repo ../baseline-checkout --runs 10 > before.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import importlib.util
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import fixtures
+
+# The libs of each package, as on the command line of a block:
+_LIBS = {'plain': [], 'vcpkg': ['-lvcpkg_tbb'], 'boost': ['-lboost_filesystem'],
+         'tbb': ['-loneapi_tbb'],
+         'all': ['-lvcpkg_tbb', '-lboost_filesystem', '-loneapi_tbb']}
+
+# Each scenario: what it times, the libs of its block, and the backend.  The native
+# scenarios run the real compiler of Linux, so they time the whole pipeline; older
+# checkouts, which have no backends, run the stubs instead.
+SCENARIOS = {
+    'init-plain': ('init', 'plain', 'msvc'),
+    'init-vcpkg': ('init', 'vcpkg', 'msvc'),
+    'init-boost': ('init', 'boost', 'msvc'),
+    'init-tbb': ('init', 'tbb', 'msvc'),
+    'run-cold': ('run-cold', 'all', 'msvc'),
+    'run-warm': ('run-warm', 'all', 'msvc'),
+    'native-cold': ('run-cold', 'plain', 'native'),
+    'native-warm': ('run-warm', 'plain', 'native'),
+    'resolve-dlls': ('resolve', 'vcpkg', 'msvc'),
+    'deploy-dlls': ('deploy', 'vcpkg', 'msvc'),
+    'redeploy-dlls': ('redeploy', 'vcpkg', 'msvc'),
+}
+
+_SRC = '#include <vector>\n#include "local.hpp"\nint main() { return LOCAL; }\n'
+
+
+class _VcpkgFinder:
+    """
+    Older checkouts import Packages.Vcpkg from vcpkg.py, as only the case-insensitive file
+    names of Windows allow, so find the module for them.
+    """
+
+    def __init__(self, path : Path):
+        self._path = path
+
+    def find_spec(self, name, path, target=None):
+        if name == 'Packages.Vcpkg':
+            return importlib.util.spec_from_file_location(name, self._path)
+        return None
+
+
+def _alias_vcpkg(repo : Path):
+    if (repo / 'Packages' / 'vcpkg.py').exists() and \
+       not (repo / 'Packages' / 'Vcpkg.py').exists():
+        sys.meta_path.insert(0, _VcpkgFinder(repo / 'Packages' / 'vcpkg.py'))
+
+
+def _vcpkg_package(argv : list[str]):
+    from Packages.Vcpkg import Vcpkg
+    return Vcpkg(argv)
+
+
+def _child(kind : str, package : str, work : Path) -> float:
+    """
+    Set up and time one run of a scenario in this process.  Return the seconds of the
+    timed part.
+    """
+    org = Path(tempfile.mkdtemp(dir=work / 'org'))
+    os.chdir(org)
+    (org / 'local.hpp').write_text('#define LOCAL 0\n')
+    src = org / 'C-src.cpp'
+    src.write_text(_SRC)
+    target = org / 'C-bin.exe'
+    argv = ['main.py', '-o', str(target), '-DBENCH', str(src)] + _LIBS[package]
+    if kind == 'init':
+        from Invocation import Invocation
+        start = time.perf_counter()
+        Invocation(argv)
+        return time.perf_counter() - start
+    if kind in ('run-cold', 'run-warm'):
+        from Invocation import Invocation
+        if kind == 'run-warm':
+            Invocation(argv).run()
+            target.unlink()
+        start = time.perf_counter()
+        Invocation(argv).run()
+        return time.perf_counter() - start
+    vcpkg = _vcpkg_package(_LIBS[package])
+    target.write_bytes(fixtures.make_pe(os.environ['STUB_LINK_IMPORTS'].split(',')))
+    if kind == 'resolve':
+        start = time.perf_counter()
+        vcpkg.locate_required_dlls(str(target))
+        return time.perf_counter() - start
+    if kind == 'redeploy':
+        vcpkg.duplicate_required_dlls(str(target))
+    start = time.perf_counter()
+    vcpkg.duplicate_required_dlls(str(target))
+    return time.perf_counter() - start
+
+
+def _prepare(work : Path, args) -> dict:
+    """
+    Create the stubs and the installations in the work directory, and return the
+    environment of the scenarios.
+    """
+    bin_dir = fixtures.write_stub_tools(work / 'bin')
+    tree_env, imports = fixtures.make_trees(work / 'trees', args.libs, args.chain)
+    (work / 'org').mkdir()
+    env = dict(os.environ)
+    env.update(tree_env)
+    # Older checkouts prepend to PATH with ';', as on Windows, which spoils its first
+    # directory on Linux, so that one is a spare:
+    env['PATH'] = os.pathsep.join([str(work / 'spare'), str(bin_dir),
+                                   env.get('PATH', '')])
+    env['HOME'] = str(work / 'home')  # Keep the caches of older checkouts apart too.
+    env['INVOKE_MSVC_CACHE_DIR'] = str(work / 'cache')
+    env['STUB_LINK_IMPORTS'] = ','.join(imports['vcpkg'] + imports['boost'] +
+                                        imports['tbb'])
+    env['STUB_CL_DELAY'] = str(args.cl_delay)
+    env['STUB_LINK_DELAY'] = str(args.link_delay)
+    env['STUB_DUMPBIN_DELAY'] = str(args.dumpbin_delay)
+    (work / 'home').mkdir()
+    return env
+
+
+def _time_scenario(name : str, repo : Path, work : Path, env : dict, runs : int) -> dict:
+    kind, package, backend = SCENARIOS[name]
+    env = dict(env, INVOKE_MSVC_BACKEND=backend)
+    times = list()
+    for _ in range(runs):
+        if kind == 'run-cold':
+            shutil.rmtree(work / 'cache', ignore_errors=True)
+        cp = subprocess.run([sys.executable, str(Path(__file__).resolve()), '--child',
+                             kind, package, str(work)],
+                            cwd=str(repo), env=env, capture_output=True, text=True)
+        if cp.returncode != 0:
+            return {'error': cp.stderr.strip().splitlines()[-1:]}
+        times.append(float(cp.stdout.strip().splitlines()[-1]))
+    return {'median_ms': 1000 * statistics.median(times), 'min_ms': 1000 * min(times),
+            'max_ms': 1000 * max(times)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repo', type=Path,
+                        default=Path(__file__).resolve().parent.parent,
+                        help='the checkout to benchmark')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--libs', type=int, default=2000,
+                        help='the number of libs in each synthetic installation')
+    parser.add_argument('--chain', type=int, default=20,
+                        help='the length of the chain of DLLs in vcpkg')
+    parser.add_argument('--cl-delay', type=float, default=0.0)
+    parser.add_argument('--link-delay', type=float, default=0.0)
+    parser.add_argument('--dumpbin-delay', type=float, default=0.0)
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help='a scenario to run (default: all)')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        sys.path.insert(0, os.getcwd())
+        _alias_vcpkg(Path.cwd())
+        kind, package, work = args.child
+        print(_child(kind, package, Path(work)))
+        return
+    repo = args.repo.resolve()
+    commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=str(repo),
+                            capture_output=True, text=True).stdout.strip()
+    results = {'repo': str(repo), 'commit': commit, 'runs': args.runs, 'libs': args.libs,
+               'chain': args.chain, 'cl_delay': args.cl_delay,
+               'link_delay': args.link_delay, 'dumpbin_delay': args.dumpbin_delay,
+               'scenarios': dict()}
+    with tempfile.TemporaryDirectory(prefix='invoke-msvc-bench-') as work:
+        env = _prepare(Path(work), args)
+        for name in args.scenario or SCENARIOS:
+            results['scenarios'][name] = _time_scenario(name, repo, Path(work), env,
+                                                        args.runs)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+from pathlib import Path
+from Packages.Wire import send_message, receive_messages
+
+# The compile server records its address and token in this file:
+STATE_PATH = Path.home() / '.invoke-msvc-server'
+
+# The environment variables which builds depend on, besides those named INVOKE_MSVC_*:
+ENV_VARS = ('CXX', 'VCPKG_ROOT', 'BOOST_ROOT', 'TBB_ROOT', 'ONEAPI_ROOT')
+
+
+def build_environment() -> dict[str, str]:
+    """
+    The environment variables of this process which builds depend on.  A compile server
+    only builds for clients whose build environment is the same as its own.
+    """
+    return {name: value for name, value in os.environ.items()
+            if name in ENV_VARS or name.startswith('INVOKE_MSVC_')}
+
+
+def _read_state() -> dict | None:
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _connect() -> tuple[socket.socket, str] | None:
+    """
+    Connect to the running compile server, if there is one.
+    """
+    state = _read_state()
+    if state is None:
+        return None
+    try:
+        sock = socket.create_connection(('127.0.0.1', state['port']), timeout=5)
+    except OSError:
+        return None
+    sock.settimeout(None)
+    return sock, state['token']
+
+
+def _start_server():
+    """
+    Start a compile server which outlives this client.
+    """
+    server_script = Path(os.path.realpath(__file__)).with_name('server.py')
+    options = dict()
+    if os.name == 'nt':
+        options['creationflags'] = subprocess.DETACHED_PROCESS | \
+            subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        options['start_new_session'] = True
+    subprocess.Popen([sys.executable, str(server_script)], cwd=str(Path.home()),
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, **options)
+
+
+def connect_or_start(timeout : float = 30.0) -> tuple[socket.socket, str]:
+    """
+    Connect to the compile server, starting one if none is running.
+    """
+    connection = _connect()
+    if connection is not None:
+        return connection
+    _start_server()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        connection = _connect()
+        if connection is not None:
+            return connection
+    raise Exception('The compile server did not start.')
+
+
+def run(argv : list[str]) -> int:
+    """
+    Forward argv, the cwd and the build environment to the compile server.  Echo its
+    output and return its exit code.  If the server was started with another build
+    environment, it exits, and a server is started with the environment of this client.
+    """
+    for _ in range(2):
+        sock, token = connect_or_start()
+        with sock:
+            send_message(sock, {'token': token, 'argv': argv, 'cwd': os.getcwd(),
+                                'env': build_environment()})
+            for message in receive_messages(sock):
+                if 'stdout' in message:
+                    sys.stdout.write(message['stdout'])
+                    sys.stdout.flush()
+                elif 'stderr' in message:
+                    sys.stderr.write(message['stderr'])
+                    sys.stderr.flush()
+                elif 'exit' in message:
+                    return message['exit']
+                elif 'restart' in message:
+                    break
+            else:
+                raise Exception('The compile server closed the connection.')
+    raise Exception('The compile server did not take the build environment.')
+
+
+if __name__ == '__main__':
+    sys.exit(run(sys.argv))
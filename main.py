@@ -1,16 +1,19 @@
 import sys
 import logging
 from pathlib import Path
-import Packages.MSVC2022 as MSVC2022
+import Packages.Backends as Backends
+import Packages.Log as Log
+import Packages.Timing as Timing
 from Invocation import Invocation
 
 
 if __name__ == '__main__':
-    logging.basicConfig(level=logging.DEBUG,
-                        filename='invoke-msvc-2022.log',
-                        format='%(asctime)s\t%(levelname)s\t%(message)s')
-    MSVC2022.setup_env()
-    logging.debug(f'CWD    == {str(Path.cwd())}')
-    logging.debug("sys.arv == {}".format(sys.argv))
-    compiler = Invocation(sys.argv)
-    compiler.run()
+    Log.setup()
+    try:
+        Backends.current().setup_env()
+        logging.debug('CWD    == %s', str(Path.cwd()))
+        logging.debug("sys.arv == %s", sys.argv)
+        compiler = Invocation(sys.argv)
+        compiler.run()
+    finally:
+        Timing.report()
@@ -0,0 +1,17 @@
+"""
+Run a target built with -run-cache, or replay its output from the run cache.  The launcher
+which takes the place of the target runs this script as:
+
+    python run.py C-bin-1.run.json args...
+"""
+import sys
+import logging
+from pathlib import Path
+import Packages.Log as Log
+import Packages.RunCache as RunCache
+
+
+if __name__ == '__main__':
+    Log.setup()
+    logging.debug("sys.arv == %s", sys.argv)
+    sys.exit(RunCache.run(Path(sys.argv[1]), sys.argv[2:]))
@@ -0,0 +1,120 @@
+import os
+import json
+import socket
+import secrets
+import logging
+import traceback
+import contextlib
+import Packages.Backends as Backends
+import Packages.Log as Log
+import Packages.Timing as Timing
+from Packages.FileLock import staging_path
+from Packages.Settings import settings
+from Invocation import Invocation
+from Packages.Wire import send_message, receive_messages
+from client import STATE_PATH, build_environment
+
+
+class _Stream:
+    """
+    A writable text stream which forwards each write to the client as a message.
+    """
+
+    def __init__(self, sock : socket.socket, name : str):
+        self._sock = sock
+        self._name = name
+
+    def write(self, text : str) -> int:
+        if text:
+            send_message(self._sock, {self._name: text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _remove_state():
+    """
+    Remove the state file, unless another server has replaced it, so no more clients
+    connect to this server.
+    """
+    with contextlib.suppress(OSError, ValueError):
+        with open(STATE_PATH) as f:
+            if json.load(f)['pid'] == os.getpid():
+                STATE_PATH.unlink()
+
+
+def _serve_request(sock : socket.socket, token : str,
+                   environment : dict[str, str]) -> bool:
+    """
+    Build the target of one request from a client, in the working directory of the
+    client, as main.py would.  Return False if the build environment of the client is not
+    the one this server was started with.  The server must then exit, so the client can
+    start one with its own, as the packages and the backend keep what they read from
+    the environment.
+    """
+    request = next(receive_messages(sock), None)
+    if request is None or request.get('token') != token:
+        logging.debug('Rejected a request without the server token.')
+        return True
+    if request.get('env', environment) != environment:
+        logging.info('Compile server exiting for a client with another environment.')
+        _remove_state()
+        send_message(sock, {'restart': True})
+        return False
+    exit_code = 0
+    with contextlib.redirect_stdout(_Stream(sock, 'stdout')), \
+         contextlib.redirect_stderr(_Stream(sock, 'stderr')):
+        try:
+            logging.debug('CWD    == %s', request["cwd"])
+            logging.debug("sys.arv == %s", request['argv'])
+            compiler = Invocation(request['argv'], cwd=request['cwd'])
+            compiler.run()
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            Timing.report()
+    send_message(sock, {'exit': exit_code})
+    return True
+
+
+def serve(environment : dict[str, str]):
+    """
+    Serve build requests on a local socket until no request has arrived for the idle
+    time of the server_idle_seconds setting, or a client has another build environment.
+    """
+    token = secrets.token_hex(16)
+    idle_seconds = settings().get('server_idle_seconds', 900)
+    with socket.create_server(('127.0.0.1', 0)) as listener:
+        port = listener.getsockname()[1]
+        state_tmp_path = staging_path(STATE_PATH)
+        with open(state_tmp_path, 'w') as f:
+            json.dump({'port': port, 'token': token, 'pid': os.getpid()}, f)
+        os.replace(state_tmp_path, STATE_PATH)
+        logging.debug('Compile server listening on port %s', port)
+        listener.settimeout(idle_seconds)
+        try:
+            while True:
+                try:
+                    sock, _ = listener.accept()
+                except socket.timeout:
+                    logging.debug('Compile server idle for %s s.', idle_seconds)
+                    break
+                with sock:
+                    sock.settimeout(None)
+                    try:
+                        if not _serve_request(sock, token, environment):
+                            break
+                    except OSError as e:
+                        logging.debug('Lost the connection to a client: %s', e)
+        finally:
+            _remove_state()
+
+
+if __name__ == '__main__':
+    # Before the backend adds the variables of its toolchain:
+    environment = build_environment()
+    Log.setup()
+    Backends.current().setup_env()
+    serve(environment)
@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+# The packages are imported as the scripts at the top of the repo import them:
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Check the interfaces of the packages and backends as their classes are created.  This
+# must be set before Packages.IPackage is first imported:
+os.environ['INVOKE_MSVC_CHECK_INTERFACES'] = '1'
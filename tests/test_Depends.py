@@ -0,0 +1,91 @@
+"""
+Parse the headers which cl.exe reports with /showIncludes and gcc writes for -MD, and
+check a dependency manifest of them.
+"""
+import os
+import json
+import pytest
+import Packages.Depends as Depends
+from Packages.NativeBackend import parse_depfile
+
+
+@pytest.fixture
+def headers(tmp_path, monkeypatch):
+    monkeypatch.setenv('INVOKE_MSVC_CACHE_DIR', str(tmp_path / 'cache'))
+    Depends._hash_cache.cache_clear()
+    paths = [tmp_path / 'a.hpp', tmp_path / 'b c.hpp']
+    for path in paths:
+        path.write_text('#pragma once\n')
+    yield paths
+    Depends._hash_cache.cache_clear()
+
+
+def test_parse_show_includes(headers):
+    a, b = headers
+    output = (f'C-src-1.cpp\n'
+              f'Note: including file: {a}\n'
+              f'Note: including file:  {b}\n'
+              f'C-src-1.cpp(3): warning C4100: unreferenced formal parameter\n'
+              f'Note: including file:   {a}\n')
+    headers, rest = Depends.parse_show_includes(output)
+    assert headers == [a, b]
+    assert rest == 'C-src-1.cpp\n' \
+        'C-src-1.cpp(3): warning C4100: unreferenced formal parameter\n'
+
+
+def test_show_includes_note_setting(headers, monkeypatch):
+    a, _ = headers
+    line = f'Remarque : inclusion du fichier : {a}\n'
+    assert Depends.included_header(line) is None
+    monkeypatch.setattr(Depends, 'settings', lambda: {
+        'show_includes_note': 'Remarque : inclusion du fichier :'})
+    assert Depends.included_header(line) == a
+
+
+def test_parse_depfile(headers):
+    a, b = headers
+    src = a.with_name('s.cpp')
+    escaped_b = str(b).replace(' ', '\\ ')
+    text = f'{src.with_suffix(".o")}: {src} \\\n {a} \\\n {escaped_b}\n'
+    assert parse_depfile(text) == [a, b]
+
+
+def test_unchanged(headers):
+    manifest = Depends.record(headers)
+    assert Depends.is_up_to_date(manifest)
+
+
+def test_mtime_changed(headers):
+    manifest = Depends.record(headers)
+    st = headers[0].stat()
+    os.utime(headers[0], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert Depends.is_up_to_date(manifest)
+
+
+def test_content_changed(headers):
+    manifest = Depends.record(headers)
+    st = headers[0].stat()
+    headers[0].write_text('#pragma twice\n')  # Of the same size.
+    os.utime(headers[0], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert not Depends.is_up_to_date(manifest)
+
+
+def test_removed(headers):
+    manifest = Depends.record(headers)
+    headers[1].unlink()
+    assert not Depends.is_up_to_date(manifest)
+
+
+def test_hash_cache_pruned(tmp_path, headers, monkeypatch):
+    monkeypatch.setattr(Depends, 'settings', lambda: {'header_hash_entries': 4})
+    Depends._hash_cache.cache_clear()
+    more = [tmp_path / f'{i}.hpp' for i in range(4)]
+    for path in more:
+        path.write_text('#pragma once\n')
+    Depends.record(headers)
+    headers[0].unlink()
+    Depends.record(more)
+    with open(tmp_path / 'cache' / 'headers' / 'hashes.json') as f:
+        hashed = list(json.load(f))
+    # The removed header is dropped, and then the least recently hashed:
+    assert hashed == [str(path) for path in more[1:]]
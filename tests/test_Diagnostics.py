@@ -0,0 +1,58 @@
+"""
+Stream the output of a tool, a Python script which prints diagnostics as cl.exe does,
+keeping at most max_diagnostics of them and max_output_kb of output.
+"""
+import sys
+import logging
+from pathlib import Path
+import Packages.Diagnostics as Diagnostics
+
+TOOL = Path(sys.executable).name
+
+
+def run(monkeypatch, lines : list[str], **limits) -> Diagnostics.ToolOutput:
+    settings = {'max_diagnostics': 20, 'max_output_kb': 256}
+    settings.update(limits)
+    monkeypatch.setattr(Diagnostics, 'settings', lambda: settings)
+    script = 'import sys\nfor line in sys.argv[1:]:\n    print(line)\n'
+    return Diagnostics.run_tool([sys.executable, '-c', script] + lines, echo=False)
+
+
+def logged(caplog, level : int) -> list[str]:
+    return [r.getMessage() for r in caplog.records
+            if r.levelno == level and r.getMessage().startswith(TOOL + ': ')]
+
+
+def test_max_output_kb(monkeypatch, caplog):
+    caplog.set_level(logging.DEBUG)
+    lines = [f'src.cpp({n}): warning C4100: {"x" * 60}' for n in range(40)]
+    result = run(monkeypatch, lines, max_diagnostics=100, max_output_kb=1)
+    *kept, note = result.text.splitlines()
+    assert kept == lines[:len(kept)]
+    assert len(''.join(line + '\n' for line in kept)) <= 1024
+    left_out = lines[len(kept):]
+    assert result.left_out == len(left_out)
+    left_out_bytes = sum(len(line) + 1 for line in left_out)
+    assert note == f'... {len(left_out)} more lines, {left_out_bytes} bytes, ' \
+        'were left out beyond max_output_kb.'
+    assert result.warnings == 40
+    assert logged(caplog, logging.DEBUG) == [f'{TOOL}: {line}' for line in left_out]
+    assert logged(caplog, logging.INFO)[-1] == f'{TOOL}: {note}'
+
+
+def test_max_diagnostics(monkeypatch, caplog):
+    caplog.set_level(logging.DEBUG)
+    lines = [f'src.cpp({n}): error C2065: undeclared identifier' for n in range(5)]
+    result = run(monkeypatch, lines, max_diagnostics=2)
+    assert result.text.splitlines() == \
+        lines[:2] + ['... 3 more diagnostics were left out.']
+    assert (result.errors, result.omitted, result.left_out) == (5, 3, 0)
+    assert logged(caplog, logging.DEBUG) == [f'{TOOL}: {line}' for line in lines[2:]]
+
+
+def test_all_kept(monkeypatch):
+    # The name of the source, which cl.exe prints first, is not kept:
+    lines = ['src.cpp', 'src.cpp(3): warning C4189: local variable is not referenced']
+    result = run(monkeypatch, lines)
+    assert result.text.splitlines() == lines[1:]
+    assert (result.returncode, result.warnings, result.left_out) == (0, 1, 0)
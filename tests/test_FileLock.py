@@ -0,0 +1,33 @@
+"""
+Lock a path from many threads and processes, each of which opens the lock file of its
+own, as they would in separate evaluations.
+"""
+import os
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pytest
+from Packages.FileLock import FileLock
+from Packages.Settings import cache_dir
+
+
+def increment(counter : Path, times : int):
+    """
+    Add times to the number in the counter file, one at a time, under the lock.
+    """
+    for _ in range(times):
+        with FileLock(counter):
+            n = int(counter.read_text())
+            counter.write_text(str(n + 1))
+
+
+@pytest.mark.parametrize('pool', [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_exclusive(tmp_path, monkeypatch, pool):
+    monkeypatch.setenv('INVOKE_MSVC_CACHE_DIR', str(tmp_path / 'cache'))
+    counter = tmp_path / 'counter'
+    counter.write_text('0')
+    with pool(max_workers=8) as executor:
+        for future in [executor.submit(increment, counter, 50) for _ in range(8)]:
+            future.result()
+    assert counter.read_text() == '400'
+    # Each lock file was removed when the lock was released:
+    assert os.listdir(cache_dir('locks')) == []
@@ -0,0 +1,37 @@
+"""
+Read the import tables of the PE images in fixtures, which were written by
+benchmarks/fixtures.make_pe().
+"""
+from pathlib import Path
+import pytest
+import Packages.PE as PE
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+
+
+def test_import_table():
+    assert PE.imported_dlls(FIXTURES / 'imports.dll') == \
+        ['KERNEL32.dll', 'SDL2.dll', 'MSVCP140.dll']
+
+
+def test_delay_import_table():
+    assert PE.imported_dlls(FIXTURES / 'delay-imports.exe') == \
+        ['KERNEL32.dll', 'tbb12.dll', 'SDL2_image.dll', 'zlib1.dll']
+
+
+@pytest.mark.parametrize('size', [0, 0x40, 0x100, 0x220])
+def test_truncated_image(tmp_path, size):
+    image = tmp_path / 'truncated.dll'
+    image.write_bytes((FIXTURES / 'delay-imports.exe').read_bytes()[:size])
+    with pytest.raises(Exception, match='PE file'):
+        PE.imported_dlls(image)
+
+
+@pytest.mark.parametrize('offset, patch', [(0, b'ZM'), (0x40, b'NE\0\0')])
+def test_corrupt_image(tmp_path, offset, patch):
+    data = bytearray((FIXTURES / 'imports.dll').read_bytes())
+    data[offset:offset + len(patch)] = patch
+    image = tmp_path / 'corrupt.dll'
+    image.write_bytes(bytes(data))
+    with pytest.raises(Exception, match='Not a PE file'):
+        PE.imported_dlls(image)
@@ -0,0 +1,105 @@
+"""
+Parse the timing reports of /Bt+, /d1reportTime and /d2cgsummary, recorded from cl.exe
+with the diagnostics of the same compilation between them, into the -time-report table.
+"""
+import Packages.TimeReport as TimeReport
+
+OUTPUT = """\
+C-src-123.cpp
+time(C:\\Program Files\\Microsoft Visual Studio\\2022\\Community\\VC\\Tools\\MSVC\\14.38.33130\\bin\\HostX64\\x64\\c1xx.dll)=2.41806s < 7183447215 - 7207627848 > BB [C-src-123.cpp]
+Include Headers:
+\tCount: 212
+\t\tc:\\boost\\include\\boost-1_82\\boost\\filesystem.hpp: 1.204761s
+\t\t\tc:\\boost\\include\\boost-1_82\\boost\\filesystem\\path.hpp: 0.871022s
+\t\tc:\\vcpkg\\installed\\x64-windows\\include\\tbb\\tbb.h: 0.652103s
+\t\tc:\\program files\\...\\include\\iostream: 0.198333s
+C-src-123.cpp(14): warning C4100: 'argc': unreferenced formal parameter
+C-src-123.cpp(21): error C2440: 'initializing': cannot convert from 'int' to 'std::string'
+\tC-src-123.cpp(21): note: Constructor for class 'std::basic_string' is declared 'explicit'
+\t\twith
+\t\t[
+\t\t\t_Elem=char: 1
+\t\t]
+Class Definitions:
+\tCount: 4471
+\t\tstd::basic_string<char,std::char_traits<char>,std::allocator<char> >: 0.021377s
+\t\ttbb::detail::d1::concurrent_vector<int,tbb::detail::d1::cache_aligned_allocator<int> >: 0.008804s
+Function Definitions:
+\tCount: 9013
+\t\tmain: 0.031502s
+\t\tboost::filesystem::path::operator/=: 0.002201s
+\tc:\\boost\\include\\boost-1_82\\boost\\filesystem\\path.hpp(32,7): warning C4996: 'path::branch_path': was declared deprecated: 2
+time(C:\\Program Files\\Microsoft Visual Studio\\2022\\Community\\VC\\Tools\\MSVC\\14.38.33130\\bin\\HostX64\\x64\\c2.dll)=0.93320s < 7207695103 - 7217027111 > BB [C-src-123.cpp]
+Code Generation Summary
+\tTotal Function Count: 1342
+\tElapsed Time: 0.911 sec
+\tTotal Compilation Time: 0.903 sec
+\tAnomalistic Compile Times: 2
+\t\tmain: 0.412 sec, 10231 instrs
+\t\t??$parallel_for@Vblocked_range@d1@detail@tbb@@@tbb@@YAXAEBV?: 0.120 sec, 2210 instrs
+\tSerialized Initializer Count: 1
+\tSerialized Initializer Time: 0.001 sec
+"""
+
+DIAGNOSTICS = [
+    "C-src-123.cpp",
+    "C-src-123.cpp(14): warning C4100: 'argc': unreferenced formal parameter",
+    "C-src-123.cpp(21): error C2440: 'initializing': cannot convert from 'int' to "
+    "'std::string'",
+    "\tC-src-123.cpp(21): note: Constructor for class 'std::basic_string' is declared "
+    "'explicit'",
+    "\t\twith",
+    "\t\t[",
+    "\t\t\t_Elem=char: 1",
+    "\t\t]",
+    "\tc:\\boost\\include\\boost-1_82\\boost\\filesystem\\path.hpp(32,7): warning C4996: "
+    "'path::branch_path': was declared deprecated: 2",
+]
+
+TABLE = """\
+| Kind | Rank | Seconds | Name |
+|------+------+---------+------|
+| Phase | 1 | 2.418 | front end |
+| Phase | 2 | 0.933 | back end |
+| Include | 1 | 1.205 | c:\\boost\\include\\boost-1_82\\boost\\filesystem.hpp |
+| Include | 2 | 0.871 | c:\\boost\\include\\boost-1_82\\boost\\filesystem\\path.hpp |
+| Include | 3 | 0.652 | c:\\vcpkg\\installed\\x64-windows\\include\\tbb\\tbb.h |
+| Class | 1 | 0.021 | std::basic_string<char,std::char_traits<char>,std::allocator<char> > |
+| Class | 2 | 0.009 | tbb::detail::d1::concurrent_vector<int,tbb::detail::d1::cache_aligned_allocator<int> > |
+| Function | 1 | 0.032 | main |
+| Function | 2 | 0.002 | boost::filesystem::path::operator/= |
+| Codegen | 1 | 0.412 | main |
+| Codegen | 2 | 0.120 | ??$parallel_for@Vblocked_range@d1@detail@tbb@@@tbb@@YAXAEBV? |
+"""
+
+
+def _split(lines):
+    report = [line for line in lines if TimeReport.is_report_line(line)]
+    others = [line.rstrip('\n') for line in lines if not TimeReport.is_report_line(line)]
+    return report, others
+
+
+def test_diagnostics_are_not_report_lines():
+    _, others = _split(OUTPUT.splitlines(keepends=True))
+    assert others == DIAGNOSTICS
+
+
+def test_parse():
+    report, _ = _split(OUTPUT.splitlines(keepends=True))
+    costs = TimeReport.parse(report)
+    assert ('Phase', 'front end', 2.41806) in costs
+    assert ('Phase', 'back end', 0.9332) in costs
+    assert ('Include', 'c:\\program files\\...\\include\\iostream', 0.198333) in costs
+    assert ('Codegen', 'main', 0.412) in costs
+    assert ('Function', 'main', 0.031502) in costs
+    assert len(costs) == 12
+
+
+def test_org_table():
+    report, _ = _split(OUTPUT.splitlines(keepends=True))
+    assert TimeReport.org_table(TimeReport.parse(report), rows=3) == TABLE
+
+
+def test_org_table_escapes_bars():
+    table = TimeReport.org_table([('Function', 'operator|', 0.5)], rows=3)
+    assert table.splitlines()[-1] == '| Function | 1 | 0.500 | operator¦ |'
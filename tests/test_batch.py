@@ -0,0 +1,59 @@
+"""
+Build a small jobs file with batch.run(), against the stub cl.exe and link.exe of
+benchmarks/fixtures.py, which sleep as if they were working.
+"""
+import os
+import sys
+from pathlib import Path
+import pytest
+import batch
+
+# The stubs of the benchmarks:
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+import fixtures
+
+CL_DELAY = 0.5
+
+
+@pytest.fixture
+def org(tmp_path, monkeypatch):
+    bin_dir = fixtures.write_stub_tools(tmp_path / 'bin')
+    monkeypatch.setenv('PATH', os.pathsep.join([str(bin_dir), os.environ['PATH']]))
+    monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+    monkeypatch.setenv('INVOKE_MSVC_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setenv('STUB_CL_DELAY', str(CL_DELAY))
+    return tmp_path
+
+
+def test_run(org, capsys):
+    jobs = list()
+    for i in range(4):
+        (org / f's{i}.cpp').write_text(f'int main() {{ return {i}; }}\n')
+        jobs.append({'source': str(org / f's{i}.cpp'), 'target': str(org / f't{i}.exe'),
+                     'cwd': str(org)})
+    # Without -o and a target, which fails:
+    jobs.insert(1, {'argv': ['main.py', str(org / 's0.cpp')], 'cwd': str(org)})
+
+    assert batch.run(jobs, max_workers=2) == 1
+
+    out, err = capsys.readouterr()
+    lines = out.splitlines()
+    assert lines[1] == '|--------+---------+--------|'
+    del lines[1]
+    assert all(line.startswith('| ') and line.endswith(' |') for line in lines)
+    rows = [[cell.strip() for cell in line.split('|')[1:-1]] for line in lines]
+    assert all(len(row) == 3 for row in rows)
+    assert rows[0] == ['Target', 'Seconds', 'Result']
+    results = {row[0]: row[2] for row in rows[1:-1]}
+    assert results == {str(org / 't0.exe'): 'ok', str(org / 's0.cpp'): 'failed',
+                       str(org / 't1.exe'): 'ok', str(org / 't2.exe'): 'ok',
+                       str(org / 't3.exe'): 'ok'}
+    assert 'Command line missing target filename.' in err
+    assert all((org / f't{i}.exe').exists() for i in range(4))
+
+    # The four builds, each of which waits for the compiler, overlap in two workers:
+    seconds = [float(row[1]) for row in rows[1:-1]]
+    total = rows[-1]
+    assert total[0] == 'Total (5 jobs, 2 workers)' and total[2] == '1 failed'
+    assert min(s for s, row in zip(seconds, rows[1:-1]) if row[2] == 'ok') >= CL_DELAY
+    assert float(total[1]) < 0.75 * sum(seconds)
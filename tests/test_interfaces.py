@@ -0,0 +1,43 @@
+"""
+Import every package and backend with INVOKE_MSVC_CHECK_INTERFACES set, as conftest.py
+sets it, so a method which overrides the interface without @overrides, or one which
+overrides nothing, fails the test run.
+"""
+import importlib
+import pytest
+from Packages.IPackage import IPackage, overrides
+from Packages.IBackend import IBackend
+import Packages.Backends as Backends
+import Packages.Registry as Registry
+
+PACKAGES = [(module_name, class_name) for _, module_name, class_name, _ in
+            Registry._PACKAGES] + [('Packages.CMake', 'CMake')]
+BACKENDS = [(module_name, class_name) for _, module_name, class_name in
+            Backends._BACKENDS]
+
+
+@pytest.mark.parametrize('module_name, class_name', PACKAGES)
+def test_package(module_name, class_name):
+    package_class = getattr(importlib.import_module(module_name), class_name)
+    assert issubclass(package_class, IPackage)
+
+
+@pytest.mark.parametrize('module_name, class_name', BACKENDS)
+def test_backend(module_name, class_name):
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    assert issubclass(backend_class, IBackend)
+
+
+def test_missing_overrides_fails():
+    with pytest.raises(TypeError, match='does not have @override'):
+        class Package(IPackage):
+            def locate_required_dlls(self, target : str) -> set[str]:
+                return set()
+
+
+def test_overriding_nothing_fails():
+    with pytest.raises(TypeError, match='should_be_used'):
+        class Package(IPackage):
+            @overrides
+            def should_be_used(self) -> bool:
+                return True
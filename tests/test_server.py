@@ -0,0 +1,67 @@
+"""
+Build through client.py and the compile server it starts, with the native backend, so
+the server runs on Linux.
+"""
+import os
+import sys
+import json
+import shutil
+import signal
+import contextlib
+import subprocess
+from pathlib import Path
+import pytest
+
+CLIENT = Path(__file__).resolve().parent.parent / 'client.py'
+
+pytestmark = pytest.mark.skipif(shutil.which(os.environ.get('CXX', 'c++')) is None,
+                                reason='no native compiler')
+
+
+@pytest.fixture
+def env(tmp_path):
+    home = tmp_path / 'home'
+    home.mkdir()
+    env = dict(os.environ, HOME=str(home), INVOKE_MSVC_BACKEND='native',
+               INVOKE_MSVC_CACHE_DIR=str(tmp_path / 'cache'))
+    yield env
+    # Stop the server which the test started, which would otherwise idle on:
+    with contextlib.suppress(OSError, ValueError):
+        os.kill(server_pid(env), signal.SIGTERM)
+
+
+def build(tmp_path : Path, env : dict) -> str:
+    """
+    Build s.cpp into t through the client, run t and return its output.
+    """
+    p = subprocess.run([sys.executable, str(CLIENT), '-o', str(tmp_path / 't'),
+                        str(tmp_path / 's.cpp')],
+                       cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120)
+    assert p.returncode == 0, p.stdout + p.stderr
+    return subprocess.run([str(tmp_path / 't')], capture_output=True, text=True,
+                          check=True).stdout
+
+
+def server_pid(env : dict) -> int:
+    with open(Path(env['HOME']) / '.invoke-msvc-server') as f:
+        return json.load(f)['pid']
+
+
+def test_rebuild_after_header_edit(tmp_path, env):
+    (tmp_path / 's.cpp').write_text(
+        '#include <cstdio>\n#include "h.hpp"\nint main() { std::printf("%d", N); }\n')
+    (tmp_path / 'h.hpp').write_text('#define N 1\n')
+    assert build(tmp_path, env) == '1'
+    pid = server_pid(env)
+    (tmp_path / 'h.hpp').write_text('#define N 2\n')
+    assert build(tmp_path, env) == '2'
+    assert server_pid(env) == pid
+
+
+def test_restart_for_another_environment(tmp_path, env):
+    (tmp_path / 's.cpp').write_text(
+        '#include <cstdio>\nint main() { std::printf("ok"); }\n')
+    assert build(tmp_path, env) == 'ok'
+    pid = server_pid(env)
+    assert build(tmp_path, dict(env, INVOKE_MSVC_LOG_LEVEL='DEBUG')) == 'ok'
+    assert server_pid(env) != pid